@@ -1,46 +1,76 @@
 #!/usr/bin/env python
 
 import hashlib
+import os
 from concurrent import futures
-from typing import TextIO
+from typing import Final, TextIO
+
+CHUNK: Final = 20_000
 
 
 def parse_data(f: TextIO) -> str:
     return f.read().rstrip()
 
 
-def _find_number_in_range(key: str, zeros: int, numbers: range) -> int | None:
-    prefix = "0" * zeros
+def _find_number_in_range(key: bytes, zeros: int, numbers: range) -> int | None:
+    # The hash state of the key is computed once and copied for each number,
+    # the zeros are checked in the raw digest: zero bytes and a half byte
+    base = hashlib.md5(key)
+    prefix = bytes(zeros // 2)
+    half = zeros % 2 == 1
     for i in numbers:
-        combined = key + str(i)
-        hash = hashlib.md5(combined.encode())
-        digest = hash.hexdigest()
-        if digest.startswith(prefix):
+        hash = base.copy()
+        hash.update(str(i).encode())
+        digest = hash.digest()
+        if digest.startswith(prefix) and not (half and digest[len(prefix)] >= 0x10):
             return i
     return None
 
 
-def _find_number(key: str, zeros: int, limit: int) -> int:
-    # Speed up using multiple processes
-    processes = 8
-    with futures.ProcessPoolExecutor(max_workers=processes) as executor:
-        tasks = []
-        for i in range(processes):
-            r = range(1 + i, limit + 1, processes)
-            t = executor.submit(_find_number_in_range, key, zeros, r)
-            tasks.append(t)
-    results = [n for t in tasks if (n := t.result()) is not None]
-    return min(results, default=0)
+def _find_number(
+    key: str, zeros: int, *, workers: int | None = None, chunk: int = CHUNK
+) -> int:
+    """Search chunks of increasing numbers in parallel.
+
+    Once a number is found no more chunks are started, and the search
+    stops as soon as all the chunks of smaller numbers are done.
+    """
+    workers = workers or os.cpu_count() or 1
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks: dict[futures.Future[int | None], int] = {}
+        start = 1
+        found = None
+
+        def submit() -> None:
+            nonlocal start
+            numbers = range(start, start + chunk)
+            task = executor.submit(_find_number_in_range, key.encode(), zeros, numbers)
+            tasks[task] = start
+            start += chunk
+
+        while True:
+            # Keep every worker busy, with a task ready for the next one
+            while found is None and len(tasks) < 2 * workers:
+                submit()
+
+            done, _ = futures.wait(tasks, return_when=futures.FIRST_COMPLETED)
+            for task in done:
+                del tasks[task]
+                if (n := task.result()) is not None and (found is None or n < found):
+                    found = n
+
+            if found is not None and all(s > found for s in tasks.values()):
+                # Drop the queued chunks instead of waiting for them on exit
+                executor.shutdown(wait=False, cancel_futures=True)
+                return found
 
 
 def part1(data: str) -> int:
-    # limit chosen manually
-    return _find_number(data, zeros=5, limit=2_000_000)
+    return _find_number(data, zeros=5)
 
 
 def part2(data: str) -> int:
-    # limit chosen manually
-    return _find_number(data, zeros=6, limit=10_000_000)
+    return _find_number(data, zeros=6)
 
 
 def main() -> None:
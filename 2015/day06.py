@@ -1,12 +1,18 @@
 #!/usr/bin/env python
 
 import re
-from collections.abc import Callable, Iterator, Mapping, Sequence
+from collections.abc import Callable, Mapping, Sequence
 from dataclasses import dataclass
 from enum import Enum
-from typing import TextIO
+from typing import Self, TextIO
+
+import numpy as np
+import numpy.typing as npt
 
 type Coord = tuple[int, int]
+type Brightness = npt.NDArray[np.int32]
+# Update the brightness of a box of lights in place
+type Update = Callable[[Brightness], None]
 
 
 class Action(Enum):
@@ -48,48 +54,94 @@ def parse_data(f: TextIO) -> list[Instruction]:
 
 
 class Lights:
-    _data: list[list[int]]
-    _actions: dict[Action, Callable[[int], int]]
-
-    def __init__(self, actions: Mapping[Action, Callable[[int], int]]):
-        self._data = [[0] * 1000 for _ in range(1000)]
+    """Lights in the cells of a grid, given by the coordinates of its edges.
+
+    Each cell is a rectangle of lights that are always updated together.
+    """
+
+    _data: Brightness
+    _area: npt.NDArray[np.int64]
+    _xs: dict[int, int]
+    _ys: dict[int, int]
+    _actions: dict[Action, Update]
+
+    def __init__(
+        self,
+        actions: Mapping[Action, Update],
+        xs: Sequence[int] = range(1001),
+        ys: Sequence[int] = range(1001),
+    ):
+        self._data = np.zeros((len(ys) - 1, len(xs) - 1), dtype=np.int32)
+        self._area = np.outer(np.diff(ys), np.diff(xs))
+        self._xs = {x: i for i, x in enumerate(xs)}
+        self._ys = {y: i for i, y in enumerate(ys)}
         self._actions = dict(actions)
 
+    @classmethod
+    def compressed(
+        cls, actions: Mapping[Action, Update], instructions: Sequence[Instruction]
+    ) -> Self:
+        """Only the cells between the edges of the instruction boxes.
+
+        Without instructions, the grid has a single edge and no cells.
+        """
+        xs, ys = set(), set()
+        for ins in instructions:
+            (x0, y0), (x1, y1) = ins.corners
+            xs |= {x0, x1 + 1}
+            ys |= {y0, y1 + 1}
+        return cls(actions, sorted(xs) or [0], sorted(ys) or [0])
+
     def process(self, instructions: Sequence[Instruction]) -> None:
         for ins in instructions:
-            fn = self._actions[ins.action]
-            for x, y in self._box(ins):
-                self._data[y][x] = fn(self._data[y][x])
+            (x0, y0), (x1, y1) = ins.corners
+            box = self._data[
+                self._ys[y0] : self._ys[y1 + 1], self._xs[x0] : self._xs[x1 + 1]
+            ]
+            self._actions[ins.action](box)
 
     def brightness(self) -> int:
-        return sum(c for r in self._data for c in r)
-
-    @staticmethod
-    def _box(ins: Instruction) -> Iterator[Coord]:
-        (x0, y0), (x1, y1) = ins.corners
-        return ((x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1))
+        return int((self._data * self._area).sum())
 
 
 def part1(instructions: Sequence[Instruction]) -> int:
+    def turn_on(box: Brightness) -> None:
+        box[...] = 1
+
+    def turn_off(box: Brightness) -> None:
+        box[...] = 0
+
+    def toggle(box: Brightness) -> None:
+        box ^= 1
+
     actions = {
-        Action.TURN_ON: lambda x: x | 1,
-        Action.TURN_OFF: lambda x: x & 0,
-        Action.TOGGLE: lambda x: x ^ 1,
+        Action.TURN_ON: turn_on,
+        Action.TURN_OFF: turn_off,
+        Action.TOGGLE: toggle,
     }
 
-    lights = Lights(actions)
+    lights = Lights.compressed(actions, instructions)
     lights.process(instructions)
     return lights.brightness()
 
 
 def part2(instructions: Sequence[Instruction]) -> int:
+    def turn_on(box: Brightness) -> None:
+        box += 1
+
+    def turn_off(box: Brightness) -> None:
+        np.maximum(box - 1, 0, out=box)
+
+    def toggle(box: Brightness) -> None:
+        box += 2
+
     actions = {
-        Action.TURN_ON: lambda x: x + 1,
-        Action.TURN_OFF: lambda x: x - 1 if x else 0,
-        Action.TOGGLE: lambda x: x + 2,
+        Action.TURN_ON: turn_on,
+        Action.TURN_OFF: turn_off,
+        Action.TOGGLE: toggle,
     }
 
-    lights = Lights(actions)
+    lights = Lights.compressed(actions, instructions)
     lights.process(instructions)
     return lights.brightness()
 
@@ -1,8 +1,21 @@
 #!/usr/bin/env python
 
 from collections.abc import Iterator
-from itertools import islice
-from typing import NamedTuple, TextIO
+from typing import Final, NamedTuple, TextIO
+
+import numpy as np
+import numpy.typing as npt
+
+type Values = npt.NDArray[np.uint64]
+
+MODULUS: Final = 2147483647
+FACTOR_A: Final = 16807
+FACTOR_B: Final = 48271
+MULTIPLE_A: Final = 4
+MULTIPLE_B: Final = 8
+LOW_BITS: Final = np.uint64(0xFFFF)
+
+BLOCK: Final = 1 << 20
 
 
 class Start(NamedTuple):
@@ -19,28 +32,93 @@ def parse_data(f: TextIO) -> Start:
 
 
 def gen_a(start: int, picky: bool = False) -> Iterator[int]:
-    factor = 16807
     val = start
     while True:
-        val = val * factor % 2147483647
-        if picky and val % 4 != 0:
+        val = val * FACTOR_A % MODULUS
+        if picky and val % MULTIPLE_A != 0:
             continue
         yield val
 
 
 def gen_b(start: int, picky: bool = False) -> Iterator[int]:
-    factor = 48271
     val = start
     while True:
-        val = val * factor % 2147483647
-        if picky and val % 8 != 0:
+        val = val * FACTOR_B % MODULUS
+        if picky and val % MULTIPLE_B != 0:
             continue
         yield val
 
 
-def duel(start: Start, n: int, picky: bool = False) -> int:
-    gen = zip(gen_a(start.a, picky), gen_b(start.b, picky), strict=False)
-    return sum(1 for a, b in islice(gen, 0, n) if a & 0xFFFF == b & 0xFFFF)
+def _powers(factor: int, n: int) -> Values:
+    # factor^1, ..., factor^n (mod MODULUS), doubling the known powers
+    powers = np.empty(n, dtype=np.uint64)
+    powers[0] = factor % MODULUS
+    k = 1
+    while k < n:
+        m = min(k, n - k)
+        powers[k : k + m] = powers[:m] * powers[k - 1] % MODULUS
+        k += m
+    return powers
+
+
+def generate(
+    start: int, factor: int, n: int, *, offset: int = 0, block: int = BLOCK
+) -> Iterator[Values]:
+    """Blocks with the `n` values following the first `offset` values.
+
+    Each block is the last value of the previous one times the powers
+    of the factor, since the values and the powers fit in 31 bits.
+    """
+    if n <= 0:
+        return
+    powers = _powers(factor, min(block, n))
+    val = start * pow(factor, offset, MODULUS) % MODULUS
+    while n > 0:
+        k = min(len(powers), n)
+        values = val * powers[:k] % MODULUS
+        yield values
+        val = int(values[-1])
+        n -= k
+
+
+def _low_bits(values: Values) -> Values:
+    return values & LOW_BITS
+
+
+def _picky_low_bits(start: int, factor: int, multiple: int, n: int) -> Values:
+    # Low bits of the first n values that are multiples, generated by blocks
+    low = np.empty(n, dtype=np.uint64)
+    found = 0
+    for values in generate(start, factor, 2**62):
+        picked = values[values % multiple == 0][: n - found]
+        low[found : found + len(picked)] = _low_bits(picked)
+        found += len(picked)
+        if found == n:
+            break
+    return low
+
+
+def duel(start: Start, n: int, picky: bool = False, *, offset: int = 0) -> int:
+    """Count the matching pairs of the `n` pairs following `offset` pairs.
+
+    Non-picky duels can be split by offset, e.g. to count each part in
+    a different process.
+    """
+    if picky and offset:
+        raise ValueError("picky duels cannot start at an offset")
+    if n <= 0:
+        return 0
+    if picky:
+        a = _picky_low_bits(start.a, FACTOR_A, MULTIPLE_A, n)
+        b = _picky_low_bits(start.b, FACTOR_B, MULTIPLE_B, n)
+        return int(np.count_nonzero(a == b))
+
+    blocks = zip(
+        generate(start.a, FACTOR_A, n, offset=offset),
+        generate(start.b, FACTOR_B, n, offset=offset),
+        strict=True,
+    )
+    return sum(int(np.count_nonzero(_low_bits(a) == _low_bits(b))) for a, b in blocks)
 
 
 def part1(start: Start) -> int:
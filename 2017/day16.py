@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 
+from functools import partial
 from typing import TextIO
 
+from aoc.cycles import fast_forward
+
 type Programs = list[str]
 type Moves = list[str]
 
@@ -29,13 +32,15 @@ def dance(programs: Programs, moves: Moves) -> Programs:
 
 
 def dance_until(programs: Programs, moves: Moves, repeats: int) -> Programs:
-    prev = [programs[:]]
-    for _ in range(repeats):
-        programs = dance(programs, moves)
-        if programs == prev[0]:
-            return prev[repeats % len(prev)]
-        prev.append(programs)
-    return programs
+    # The dance only moves the programs around, keep them all to skip ahead
+    return fast_forward(
+        programs,
+        partial(dance, moves=moves),
+        repeats,
+        key=tuple,
+        value=list,
+        verify=False,
+    )
 
 
 def part1(programs: str, moves: Moves) -> str:
@@ -1,19 +1,21 @@
 #!/usr/bin/env python
 
-from collections import deque
 from typing import TextIO
 
+from aoc.ring import Ring
+
 
 def parse_data(f: TextIO) -> int:
     return int(f.read())
 
 
 def part1(steps: int, last: int = 2017) -> int:
-    buffer = deque([0])
+    buffer = Ring([0], last + 1)
+    current = 0
     for i in range(1, last + 1):
-        buffer.rotate(-steps)
-        buffer.append(i)
-    return buffer[0]
+        buffer.insert_after(buffer.after(current, steps % i), i)
+        current = i
+    return buffer.after(current)
 
 
 def part2(steps: int, last: int = 50_000_000) -> int:
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
-from collections import defaultdict, deque
-from itertools import cycle
+from collections import deque
 from typing import TextIO
 
 
@@ -13,21 +12,24 @@ def parse_data(f: TextIO) -> tuple[int, int]:
 
 
 def marble_mania(players: int, marbles: int) -> tuple[int, int]:
+    # The current marble is kept in the last position of the circle
     circle = deque([0])
-    score = defaultdict[int, int](int)
-
-    plays = zip(cycle(range(1, players + 1)), range(1, marbles + 1))
-    for player, marble in plays:
-        # keep current marble in the last position
-        if marble % 23 == 0:
-            circle.rotate(7)
-            score[player] += marble + circle.pop()
-            circle.rotate(-1)
-        else:
-            circle.rotate(-1)
-            circle.append(marble)
-
-    return max(score.items(), key=lambda e: e[1])
+    rotate, append, pop = circle.rotate, circle.append, circle.pop
+    # The score of each player, by marble % players (0 for the last player)
+    score = [0] * players
+
+    # Marbles are placed in runs of 22, between the multiples of 23
+    for base in range(0, marbles + 1, 23):
+        for marble in range(base + 1, min(base + 23, marbles + 1)):
+            rotate(-1)
+            append(marble)
+        if (marble := base + 23) <= marbles:
+            rotate(7)
+            score[marble % players] += marble + pop()
+            rotate(-1)
+
+    winner = max(range(players), key=score.__getitem__)
+    return winner or players, score[winner]
 
 
 def part1(players: int, marbles: int) -> int:
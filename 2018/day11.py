@@ -1,12 +1,22 @@
 #!/usr/bin/env python
 
 from collections.abc import Sequence
+from concurrent import futures
+from itertools import repeat
 from typing import Final, NamedTuple, TextIO
 
+import numpy as np
+import numpy.typing as npt
+
 N: Final = 300
+MIN_LEVEL: Final = -5
+
+# The upper bound of the window sums of a size uses covering windows taken
+# every STRIDE positions, which take 1/STRIDE^2 of the work of all windows
+STRIDE: Final = 4
 
 type Coord = tuple[int, int]
-type Grid = Sequence[Sequence[int]]
+type Grid = npt.NDArray[np.int64]
 
 
 class MaxPower(NamedTuple):
@@ -27,52 +37,128 @@ def power_level(coord: Coord, serial: int) -> int:
     return level - 5
 
 
-def make_grid(serial: int) -> Grid:
-    return [[power_level((x, y), serial) for x in range(N + 1)] for y in range(N + 1)]
+def make_grids(serials: Sequence[int], size: int = N) -> Grid:
+    """The grids of the serials, with the power level of (x, y) at [i, y-1, x-1]."""
+    x = np.arange(1, size + 1, dtype=np.int64)
+    y = x[:, np.newaxis]
+    serial = np.array(serials, dtype=np.int64)[:, np.newaxis, np.newaxis]
+    rack_id = x + 10
+    level = (rack_id * y + serial) * rack_id
+    level = (level // 100) % 10
+    return level - 5
+
+
+def make_grid(serial: int, size: int = N) -> Grid:
+    grid: Grid = make_grids([serial], size)[0]
+    return grid
+
+
+def _summed_areas(grids: Grid) -> Grid:
+    # With a leading row and column of zeros, the sum of the cells above
+    # and left of (x, y) is at [i, y, x]
+    n, h, w = grids.shape
+    sat = np.zeros((n, h + 1, w + 1), dtype=np.int64)
+    sat[:, 1:, 1:] = grids.cumsum(axis=1).cumsum(axis=2)
+    return sat
+
+
+def _window_sums(sat: Grid, k: int) -> Grid:
+    return sat[:, k:, k:] - sat[:, :-k, k:] - sat[:, k:, :-k] + sat[:, :-k, :-k]
+
+
+def _upper_bounds(sat: Grid, k: int) -> Grid | None:
+    """An upper bound of the sums of the k x k windows of each grid.
+
+    Each window is inside a covering window of size k + STRIDE - 1, taken
+    every STRIDE positions and at the last one, and the cells of the cover
+    outside the window add at least MIN_LEVEL each.
+    """
+    _, h, w = sat.shape
+    cover = k + STRIDE - 1
+    if cover > min(h, w) - 1:
+        return None
+
+    def starts(length: int) -> npt.NDArray[np.intp]:
+        last = length - 1 - cover
+        return np.unique(np.r_[np.arange(0, last + 1, STRIDE), last])
+
+    y, x = starts(h)[:, np.newaxis], starts(w)
+    sums = (
+        sat[:, y + cover, x + cover]
+        - sat[:, y, x + cover]
+        - sat[:, y + cover, x]
+        + sat[:, y, x]
+    )
+    return sums.max(axis=(1, 2)) - MIN_LEVEL * (cover * cover - k * k)
+
+
+def _max_windows(sat: Grid, k: int) -> list[MaxPower]:
+    # The first window in reading order with the max sum, for each grid
+    sums = _window_sums(sat, k)
+    n, _, w = sums.shape
+    flat = sums.reshape(n, -1)
+    pos = flat.argmax(axis=1)
+    powers = flat[np.arange(n), pos]
+    y, x = np.divmod(pos, w)
+    return [
+        MaxPower((int(x) + 1, int(y) + 1), k, int(p))
+        for x, y, p in zip(x, y, powers, strict=True)
+    ]
+
+
+def _max_powers(sat: Grid, sizes: Sequence[int]) -> list[MaxPower]:
+    # Each size is only searched in the grids where its upper bound is
+    # above the best power found so far
+    best = _max_windows(sat, sizes[0])
+    for k in sizes[1:]:
+        if (bounds := _upper_bounds(sat, k)) is None:
+            active = list(range(len(best)))
+        else:
+            active = [i for i, b in enumerate(bounds) if b > best[i].power]
+        if not active:
+            continue
+        found = _max_windows(sat if len(active) == len(best) else sat[active], k)
+        for i, m in zip(active, found, strict=True):
+            if m.power > best[i].power:
+                best[i] = m
+    return best
+
+
+def max_power_dials(
+    grids: Grid, start: int = 1, end: int | None = None, *, workers: int = 1
+) -> list[MaxPower]:
+    """The max power square of each grid, for the sizes from start to end.
+
+    The window sums of each size are computed at once for all the grids,
+    from their summed-area tables. With more than one worker, the sizes
+    are split between processes, which is only worth it for large grids.
+    """
+    sat = _summed_areas(grids)
+    stop = end if end is not None else min(grids.shape[1:])
+    sizes = range(start, stop + 1)
+
+    if workers == 1:
+        results = [_max_powers(sat, sizes)]
+    else:
+        # Interleaved, so every worker starts with small sizes to prune the rest
+        chunks = [c for i in range(workers) if (c := sizes[i::workers])]
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_max_powers, repeat(sat), chunks))
+
+    # The smallest size wins the ties, like for a single worker
+    return [
+        max(ms, key=lambda m: (m.power, -m.size)) for ms in zip(*results, strict=True)
+    ]
+
+
+def max_power_dial(
+    grid: Grid, start: int = 1, end: int | None = None, *, workers: int = 1
+) -> MaxPower:
+    return max_power_dials(grid[np.newaxis], start, end, workers=workers)[0]
 
 
-# Optimize for fun with partial sums
-# but brute force O(k^2 n^2) would do just fine for k=3
 def max_power_fixed(grid: Grid, k: int = 3) -> MaxPower:
-    L = (N - k) + 1  # noqa: N806
-    P = [[0] * (N + 1) for _ in range(N + 1)]  # noqa: N806
-
-    for y in range(1, N + 1):
-        t = sum(grid[y][x] for x in range(1, k + 1))
-        P[y][1] = t
-
-        for x in range(2, L + 1):
-            t += grid[y][x + k - 1] - grid[y][x - 1]
-            P[y][x] = t
-
-    m = MaxPower((0, 0), k, -1)
-    for x in range(1, L + 1):
-        t = sum(P[y][x] for y in range(1, k + 1))
-        m = max(MaxPower((x, 1), k, t), m, key=lambda t: t.power)
-
-        for y in range(2, L + 1):
-            t += P[y + k - 1][x] - P[y - 1][x]
-            m = max(MaxPower((x, y), k, t), m, key=lambda t: t.power)
-
-    return m
-
-
-# Brute force would be O(n^5), too much.
-# Use cumulative sums to make it O(n^3).
-def max_power_dial(grid: Grid, start: int = 1, end: int = N) -> MaxPower:
-    C = [[0] * (N + 1) for _ in range(N + 1)]  # noqa: N806
-    for y in range(1, N + 1):
-        for x in range(1, N + 1):
-            C[y][x] = grid[y][x] + C[y - 1][x] + C[y][x - 1] - C[y - 1][x - 1]
-
-    m = MaxPower((0, 0), 0, -1)
-    for k in range(start, end + 1):
-        for y in range(k, N + 1):
-            for x in range(k, N + 1):
-                p = C[y][x] - C[y - k][x] - C[y][x - k] + C[y - k][x - k]
-                if p > m.power:
-                    m = MaxPower((x - k + 1, y - k + 1), k, p)
-    return m
+    return max_power_dial(grid, k, k)
 
 
 def part1(grid: Grid) -> MaxPower:
@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 
 from collections.abc import Mapping
+from functools import partial
 from typing import Final, TextIO
 
+from aoc.cycles import extrapolate
+
 type Notes = Mapping[str, str]
+# The state of the pots, with the index of the pot 0
+type Pots = tuple[str, int]
 
 NO_PLANT: Final = "."
 PLANT: Final = "#"
@@ -27,59 +32,54 @@ def parse_data(f: TextIO) -> tuple[str, Notes]:
     return state, notes
 
 
-def spread_plants(state: str, notes: Notes, total_gen: int) -> tuple[str, int]:
+def next_generation(pots: Pots, notes: Notes) -> Pots:
+    state, idx = pots
+
     # The rules go from i-2 to i+2 for each pot i
     # Add L <no_plant> at each side
-    pots = NO_PLANT * L + state + NO_PLANT * L
-    # The index of the pot 0
-    idx = L
-
-    for i in range(total_gen):
-        # Apply rules
-        tmp = [NO_PLANT] * len(pots)
-        for j in range(2, len(pots) - 2):
-            tmp[j] = notes.get(pots[j - 2 : j + 3], NO_PLANT)
-        new_gen = "".join(tmp)
-
-        # Keep at least L <no_plant> at the end of the state
-        if PLANT in new_gen[-L:]:
-            new_gen = new_gen + NO_PLANT
-
-        # Keep L <no_plant> at the beginning of the state, removing extra
-        # (to keep it of printable size).
-        # Adjust the zero index accordingly.
-        if PLANT in new_gen[:L]:
-            new_gen = NO_PLANT + new_gen
-            idx += 1
-        else:
-            f = new_gen.index(PLANT) - L
-            new_gen = new_gen[f:]
-            idx -= f
-            # After a while all states are the same but shifted to the right
-            # <https://en.wikipedia.org/wiki/Glider_(Conway%27s_Life)>
-            # so no need to iterate, just calculate the zero index for the
-            # remaining iterations
-            if new_gen == pots:
-                idx -= (total_gen - i - 1) * f
-                break
-
-        pots = new_gen
-
-    return pots, idx
-
-
-def sum_pots(pots: str, idx: int) -> int:
-    return sum(i - idx for i, p in enumerate(pots) if p == PLANT)
+    padded = NO_PLANT * L + state + NO_PLANT * L
+    idx += L
+
+    # Apply rules
+    tmp = [NO_PLANT] * len(padded)
+    for j in range(2, len(padded) - 2):
+        tmp[j] = notes.get(padded[j - 2 : j + 3], NO_PLANT)
+    new_gen = "".join(tmp)
+
+    # Keep only the pots between the first and last plant,
+    # adjusting the zero index accordingly
+    first = new_gen.find(PLANT)
+    if first < 0:
+        return "", 0
+    last = new_gen.rindex(PLANT)
+    return new_gen[first : last + 1], idx - first
+
+
+def spread_plants(state: str, notes: Notes, total_gen: int) -> int:
+    # After a while all states are the same but shifted to the right
+    # <https://en.wikipedia.org/wiki/Glider_(Conway%27s_Life)>
+    # so the sum of the pots changes by the same amount every generation
+    return extrapolate(
+        (state, 0),
+        partial(next_generation, notes=notes),
+        total_gen,
+        key=lambda p: p[0],
+        value=sum_pots,
+        verify=False,
+    )
+
+
+def sum_pots(pots: Pots) -> int:
+    state, idx = pots
+    return sum(i - idx for i, p in enumerate(state) if p == PLANT)
 
 
 def part1(state: str, notes: Notes) -> int:
-    pots, idx = spread_plants(state, notes, 20)
-    return sum_pots(pots, idx)
+    return spread_plants(state, notes, 20)
 
 
 def part2(state: str, notes: Notes) -> int:
-    pots, idx = spread_plants(state, notes, 50_000_000_000)
-    return sum_pots(pots, idx)
+    return spread_plants(state, notes, 50_000_000_000)
 
 
 def main() -> None:
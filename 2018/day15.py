@@ -1,47 +1,49 @@
 #!/usr/bin/env python
 
 import logging
-import logging.config
 from collections.abc import Sequence
 from dataclasses import dataclass
 from io import StringIO
 from itertools import count
 from typing import Final, Self, TextIO
 
-type Position = tuple[int, int]
-type Move = tuple[Position, Position]
+from aoc import trace
+from aoc.pathfinding import UNREACHED, Cell, Layout
 
 
 def read_data(f: TextIO) -> list[str]:
     return [l.rstrip() for l in f]
 
 
+MAX_HP: Final = 200
+
+
 class Unit:
     side: Final[str]
     enemy: Final[str]
     atk: Final[int]
     _hp: int
-    _pos: Position
+    _pos: Cell
 
     ELF: Final = "E"
     GOBLIN: Final = "G"
 
-    def __init__(self, side: str, pos: Position, atk: int):
+    def __init__(self, side: str, pos: Cell, atk: int):
         self.side = side
         self.enemy = Unit.GOBLIN if side == Unit.ELF else Unit.ELF
         self.atk = atk
-        self._hp = 200
+        self._hp = MAX_HP
         self._pos = pos
 
     @property
-    def pos(self) -> Position:
+    def pos(self) -> Cell:
         return self._pos
 
     @property
     def hp(self) -> int:
         return self._hp
 
-    def move(self, pos: Position) -> None:
+    def move(self, pos: Cell) -> None:
         self._pos = pos
 
     def is_alive(self) -> bool:
@@ -70,8 +72,12 @@ class Winner:
 
 
 class Battle:
-    _area: Final[dict[Position, str]]
+    _layout: Final[Layout]
+    _adjacency: Final[list[tuple[Cell, ...]]]
+    _area: Final[list[str]]
+    _occupants: Final[list[Unit | None]]
     _units: Final[list[Unit]]
+    _armies: Final[dict[str, list[Unit]]]
     _killed: Final[dict[str, int]]
 
     DEFAULT_ATK: Final = 3
@@ -82,161 +88,223 @@ class Battle:
     ENEMY: Final = {Unit.ELF: Unit.GOBLIN, Unit.GOBLIN: Unit.ELF}
 
     def __init__(self, data: Sequence[str], elf_atk: int = DEFAULT_ATK):
-        self._area = {}
+        # The area and its units are flat lists of the cells, in reading order
+        self._layout = Layout(max(map(len, data)), len(data))
+        self._adjacency = self._layout.adjacency()
+        self._area = list("".join(l.ljust(self._layout.width) for l in data))
+        self._occupants = [None] * self._layout.size
         self._units = []
+        self._armies = {Unit.ELF: [], Unit.GOBLIN: []}
         self._killed = {Unit.ELF: 0, Unit.GOBLIN: 0}
 
-        for i, l in enumerate(data):
-            for j, c in enumerate(l):
-                p = (i, j)
-                if self._is_unit(c):
-                    atk = elf_atk if c == Unit.ELF else self.DEFAULT_ATK
-                    self._units.append(Unit(c, p, atk))
-                self._area[p] = c
+        for p, c in enumerate(self._area):
+            if self._is_unit(c):
+                atk = elf_atk if c == Unit.ELF else self.DEFAULT_ATK
+                unit = Unit(c, p, atk)
+                self._occupants[p] = unit
+                self._units.append(unit)
+                self._armies[c].append(unit)
 
     def run(self) -> Winner:
+        winner = self._fight()
+        assert winner is not None
+        return winner
+
+    def run_without_losses(self, side: str) -> Winner | None:
+        """The winner, or None as soon as a unit of the side is killed."""
+        return self._fight(side)
+
+    def _fight(self, no_losses: str | None = None) -> Winner | None:
         def round() -> str | None:
             for unit in sorted(self._units, key=lambda u: u.pos):
                 # Unit could have been killed by a previous attack in this round
                 if not unit.is_alive():
                     continue
                 # Side wins if there are no remaining enemies
-                enemies = self._enemies(unit)
+                enemies = self._armies[unit.enemy]
                 if not enemies:
                     return unit.side
                 # Optionally move before attacking
                 self._move(unit, enemies)
                 # Attack target in range, if any
-                self._attack(unit, enemies)
+                self._attack(unit)
+                if no_losses is not None and self._killed[no_losses]:
+                    raise _LossError
             return None
 
-        if debug := logging.getLogger().isEnabledFor(logging.DEBUG):
+        if debug := trace.enabled(logging.DEBUG):
             logging.debug("Initially:")
             logging.debug(f"{self}")
 
-        for k in count(1):
-            winner = round()
-            if debug:
-                logging.debug(f"After {k} rounds:" if winner is None else "Last round:")
-                logging.debug(f"{self}")
-            if winner is not None:
-                return self._winner(winner, k - 1)
+        with trace.span("battle"):
+            for k in count(1):
+                try:
+                    winner = round()
+                except _LossError:
+                    trace.count("rounds", k)
+                    return None
+                if debug:
+                    logging.debug(
+                        f"After {k} rounds:" if winner is None else "Last round:"
+                    )
+                    logging.debug(f"{self}")
+                if winner is not None:
+                    trace.count("rounds", k)
+                    return self._winner(winner, k - 1)
 
         raise AssertionError
 
     def _move(self, unit: Unit, enemies: Sequence[Unit]) -> None:
-        if self._has_enemies_in_range(unit):
+        if self._enemies_in_range(unit):
             return
-        if moves := self._bfs(unit.pos, enemies):
-            _, start = moves[0]
+        with trace.span("search"):
+            start = self._first_step(unit.pos, enemies)
+        if start is not None:
             self._area[unit.pos] = self.CAVERN
+            self._occupants[unit.pos] = None
             unit.move(start)
             self._area[unit.pos] = unit.side
+            self._occupants[unit.pos] = unit
 
-    def _attack(self, unit: Unit, enemies: Sequence[Unit]) -> None:
-        if targets := self._enemies_in_range(unit, enemies):
+    def _attack(self, unit: Unit) -> None:
+        if targets := self._enemies_in_range(unit):
             selected = min(targets, key=lambda e: (e.hp, e.pos))
             unit.attack(selected)
             if not selected.is_alive():
                 self._area[selected.pos] = self.CAVERN
+                self._occupants[selected.pos] = None
+                self._armies[selected.side].remove(selected)
                 self._killed[selected.side] += 1
 
-    def _bfs(self, orig: Position, enemies: Sequence[Unit]) -> list[Move]:
-        def adj(pos: Position) -> list[Position]:
-            return [p for p in self._in_range(pos) if self._area[p] == self.CAVERN]
-
-        goals = {p for e in enemies for p in adj(e.pos)}
-        moves = []
+    def _first_step(self, orig: Cell, enemies: Sequence[Unit]) -> Cell | None:
+        area = self._area
+        adjacency = self._adjacency
+        cavern = self.CAVERN
 
-        # Start by moving to all adjacent positions, at distance 1
-        queue = [(p, p) for p in adj(orig)]
-        visited = {orig}
-
-        found = False
-        while queue:
-            next_queue: list[Move] = []
-            # Check all moves of distance d
-            for target, start in queue:
-                if target in visited:
-                    continue
-                visited.add(target)
-                # if there is an enemy in range, distance d is the minimal distance
-                if target in goals:
-                    moves.append((target, start))
-                    found = True
-                    continue
-                # Add moves of distance d + 1
-                next_queue.extend((p, start) for p in adj(target))
-            if found:
-                break
-            # Replace moves of distance d with moves of distance d + 1
-            queue = next_queue
+        starts = [p for p in adjacency[orig] if area[p] == cavern]
+        if not starts:
+            return None
 
-        # Return moves with minimal distance, sorted by end position
-        return sorted(moves)
+        # A single search from all the squares in range of an enemy, which
+        # keeps for each square its distance to the nearest of them, and the
+        # first of those in reading order
+        dist = [UNREACHED] * self._layout.size
+        nearest = [0] * self._layout.size
+        frontier = []
+        for e in enemies:
+            for p in adjacency[e.pos]:
+                if area[p] == cavern and dist[p] == UNREACHED:
+                    dist[p] = 0
+                    nearest[p] = p
+                    frontier.append(p)
+
+        d = 0
+        while frontier and all(dist[p] == UNREACHED for p in starts):
+            d += 1
+            layer = []
+            for cell in frontier:
+                target = nearest[cell]
+                for p in adjacency[cell]:
+                    if area[p] != cavern:
+                        continue
+                    if dist[p] == UNREACHED:
+                        dist[p] = d
+                        nearest[p] = target
+                        layer.append(p)
+                    elif dist[p] == d and target < nearest[p]:
+                        nearest[p] = target
+            frontier = layer
+
+        # The nearest target, and the first step towards it, in reading order
+        reached = [(dist[p], nearest[p], p) for p in starts if dist[p] != UNREACHED]
+        if not reached:
+            return None
+        *_, start = min(reached)
+        return start
 
     def _winner(self, winner: str, rounds: int) -> Winner:
         atk = next(u.atk for u in self._units if u.side == winner)
-        total_hp = sum(u.hp for u in self._units if u.side == winner and u.is_alive())
+        total_hp = sum(u.hp for u in self._armies[winner])
         points = total_hp * rounds
         return Winner(winner, atk, rounds, points, self._killed[winner])
 
-    def _enemies(self, unit: Unit) -> list[Unit]:
-        return [u for u in self._units if u.side == unit.enemy and u.is_alive()]
-
-    def _enemies_in_range(self, unit: Unit, enemies: Sequence[Unit]) -> list[Unit]:
-        near_positions = self._in_range(unit.pos)
-        return [e for e in enemies if e.pos in near_positions]
-
-    def _has_enemies_in_range(self, unit: Unit) -> bool:
-        return any(self._area[pos] == unit.enemy for pos in self._in_range(unit.pos))
-
-    @staticmethod
-    def _in_range(pos: Position) -> tuple[Position, ...]:
-        y, x = pos
-        return ((y - 1, x), (y, x - 1), (y, x + 1), (y + 1, x))
+    def _enemies_in_range(self, unit: Unit) -> list[Unit]:
+        occupants = self._occupants
+        return [
+            u
+            for p in self._adjacency[unit.pos]
+            if (u := occupants[p]) is not None and u.side == unit.enemy
+        ]
 
     @staticmethod
     def _is_unit(c: str) -> bool:
         return c == Unit.ELF or c == Unit.GOBLIN
 
     def __str__(self) -> str:
-        def find_unit(pos: Position) -> Unit:
-            return next(u for u in self._units if u.pos == pos and u.is_alive())
-
-        n, m = max(self._area)
+        width = self._layout.width
         buf = StringIO()
-        for i in range(n + 1):
-            row = [((p := (i, j)), self._area[p]) for j in range(m + 1)]
-            buf.write("".join(c for _, c in row))
-            if units := [find_unit(p) for p, c in row if self._is_unit(c)]:
+        for start in range(0, self._layout.size, width):
+            buf.write("".join(self._area[start : start + width]))
+            units = [u for u in self._occupants[start : start + width] if u is not None]
+            if units:
                 buf.write("   ")
                 buf.write(", ".join(str(u) for u in units))
             buf.write("\n")
         return buf.getvalue()
 
 
+class _LossError(Exception):
+    pass
+
+
 def part1(data: Sequence[str]) -> Winner:
     battle = Battle(data)
     result = battle.run()
-    if logging.getLogger().isEnabledFor(logging.INFO):
+    if trace.enabled(logging.INFO):
         logging.info(f"{battle}")
     return result
 
 
 def part2(data: Sequence[str]) -> Winner:
-    for atk in count(4):
-        battle = Battle(data, elf_atk=atk)
-        result = battle.run()
-        if result.side == Unit.ELF and result.killed == 0:
-            if logging.getLogger().isEnabledFor(logging.INFO):
-                logging.info(f"{battle}")
-            return result
-    raise AssertionError
+    results: dict[int, tuple[Battle, Winner | None]] = {}
+
+    def flawless(atk: int) -> bool:
+        # Elves win without losses, stopping the battle at the first loss
+        if atk not in results:
+            trace.count("battles")
+            battle = Battle(data, elf_atk=atk)
+            results[atk] = battle, battle.run_without_losses(Unit.ELF)
+        return results[atk][1] is not None
+
+    # Double the attack until the elves win, then search the lowest one
+    lo, hi = Battle.DEFAULT_ATK, Battle.DEFAULT_ATK + 1
+    while not flawless(hi):
+        lo, hi = hi, 2 * hi
+        if lo > MAX_HP:
+            raise AssertionError
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if flawless(mid):
+            hi = mid
+        else:
+            lo = mid
+
+    # The search assumes that a stronger attack never makes elves lose,
+    # which is not always true, as killing goblins faster changes the
+    # paths of the battle
+    if not flawless(hi + 1):
+        logging.warning("Elves can lose with a stronger attack, trying all of them")
+        hi = next(atk for atk in count(Battle.DEFAULT_ATK + 1) if flawless(atk))
+
+    battle, result = results[hi]
+    assert result is not None
+    if trace.enabled(logging.INFO):
+        logging.info(f"{battle}")
+    return result
 
 
 def main() -> None:
-    logging.config.fileConfig("../logging.conf")
+    trace.configure()
 
     data = read_data(open(0))
 
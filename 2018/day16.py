@@ -2,47 +2,19 @@
 
 import re
 from collections import defaultdict
-from collections.abc import Callable, Iterator, Sequence
+from collections.abc import Iterator, Sequence
 from itertools import count
 from typing import TextIO
 
-type Registers = list[int]
-type Instruction = tuple[int, int, int, int]
-type Sample = tuple[Instruction, Registers, Registers]
+from elfcode import VM, Program, Registers, opcodes_fn
 
-type OpCodeFn = Callable[[Registers, int, int, int], None]
+type RawInstruction = tuple[int, int, int, int]
+type Sample = tuple[RawInstruction, Registers, Registers]
 
 type OpCodesCandidates = dict[int, set[str]]
 type OpCodes = dict[int, str]
 
 
-def _wrap(op: Callable[[Registers, int, int], int]) -> OpCodeFn:
-    def fn(regs: Registers, a: int, b: int, c: int) -> None:
-        regs[c] = op(regs, a, b)
-
-    return fn
-
-
-opcodes_fn: dict[str, OpCodeFn] = {
-    "addr": _wrap(lambda r, a, b: r[a] + r[b]),
-    "addi": _wrap(lambda r, a, b: r[a] + b),
-    "mulr": _wrap(lambda r, a, b: r[a] * r[b]),
-    "muli": _wrap(lambda r, a, b: r[a] * b),
-    "banr": _wrap(lambda r, a, b: r[a] & r[b]),
-    "bani": _wrap(lambda r, a, b: r[a] & b),
-    "borr": _wrap(lambda r, a, b: r[a] | r[b]),
-    "bori": _wrap(lambda r, a, b: r[a] | b),
-    "setr": _wrap(lambda r, a, b: r[a]),
-    "seti": _wrap(lambda r, a, b: a),
-    "gtir": _wrap(lambda r, a, b: 1 if a > r[b] else 0),
-    "gtri": _wrap(lambda r, a, b: 1 if r[a] > b else 0),
-    "gtrr": _wrap(lambda r, a, b: 1 if r[a] > r[b] else 0),
-    "eqir": _wrap(lambda r, a, b: 1 if a == r[b] else 0),
-    "eqri": _wrap(lambda r, a, b: 1 if r[a] == b else 0),
-    "eqrr": _wrap(lambda r, a, b: 1 if r[a] == r[b] else 0),
-}
-
-
 def read_data(f: TextIO) -> list[str]:
     return [l.rstrip() for l in f]
 
@@ -65,14 +37,14 @@ def read_samples(data: Sequence[str]) -> Iterator[Sample]:
         yield parse_sample(sample)
 
 
-def read_program(data: Sequence[str]) -> Iterator[Instruction]:
+def read_program(data: Sequence[str]) -> Iterator[RawInstruction]:
     i = 0
     while data[i]:  # skip sample data
         i += 4
     while not data[i]:  # skip empty lines
         i += 1
 
-    def parse_instruction(line: str) -> Instruction:
+    def parse_instruction(line: str) -> RawInstruction:
         op, a, b, c = map(int, line.split())
         return (op, a, b, c)
 
@@ -127,11 +99,10 @@ def _reduce_opcodes(data: Sequence[str]) -> OpCodes:
 
 def execute_program(data: Sequence[str]) -> Registers:
     opcodes = _reduce_opcodes(data)
-    regs = [0] * 4
-    for op, a, b, c in read_program(data):
-        fn = opcodes_fn[opcodes[op]]
-        fn(regs, a, b, c)
-    return regs
+    program = Program(
+        None, [(opcodes[op], a, b, c) for op, a, b, c in read_program(data)]
+    )
+    return VM(program).run([0] * 4)
 
 
 def part1(data: Sequence[str]) -> int:
@@ -1,84 +1,65 @@
 #!/usr/bin/env python
 
 import logging
-import logging.config
 from collections.abc import Sequence
-from functools import cache
 from typing import Final, Self, TextIO
 
+import numpy as np
+
+from aoc import trace
+from aoc.automaton import Grid, adjacent_counts, cell, parse_grid, render
+from aoc.cycles import fast_forward, fingerprint
+
 
 def read_data(f: TextIO) -> list[str]:
     return f.readlines()
 
 
 class Area:
-    _acres: list[list[str]]
-    _width: Final[int]
-    _height: Final[int]
+    _acres: Grid
 
-    OPEN: Final = "."
-    TREES: Final = "|"
-    LUMBERJACK: Final = "#"
+    OPEN: Final = cell(".")
+    TREES: Final = cell("|")
+    LUMBERJACK: Final = cell("#")
 
-    def __init__(self, acres: list[list[str]]):
+    def __init__(self, acres: Grid):
         self._acres = acres
-        self._width = len(acres[0])
-        self._height = len(acres)
 
     @classmethod
     def parse(cls, data: Sequence[str]) -> Self:
-        return cls([list(l.rstrip()) for l in data])
-
-    def update(self) -> None:
-        updated = [r[:] for r in self._acres]
-        for i in range(self._height):
-            for j in range(self._width):
-                adj = self._adjacent_acres(i, j)
-                match self._acres[i][j]:
-                    case Area.OPEN:
-                        if sum(1 for a in adj if a == Area.TREES) >= 3:
-                            updated[i][j] = Area.TREES
-                    case Area.TREES:
-                        if sum(1 for a in adj if a == Area.LUMBERJACK) >= 3:
-                            updated[i][j] = Area.LUMBERJACK
-                    case Area.LUMBERJACK:
-                        if not (Area.LUMBERJACK in adj and Area.TREES in adj):
-                            updated[i][j] = Area.OPEN
+        return cls(parse_grid(data))
+
+    def update(self) -> Self:
+        acres = self._acres
+        trees = acres == Area.TREES
+        lumberjacks = acres == Area.LUMBERJACK
+        adj_trees = adjacent_counts(trees)
+        adj_lumberjacks = adjacent_counts(lumberjacks)
+
+        updated = acres.copy()
+        updated[(acres == Area.OPEN) & (adj_trees >= 3)] = Area.TREES
+        updated[trees & (adj_lumberjacks >= 3)] = Area.LUMBERJACK
+        updated[lumberjacks & ((adj_lumberjacks == 0) | (adj_trees == 0))] = Area.OPEN
         self._acres = updated
-
-    def _adjacent_acres(self, y: int, x: int) -> list[str]:
-        return [self._acres[i][j] for i, j in self._adjacent_positions(y, x)]
-
-    @cache  # noqa: B019
-    def _adjacent_positions(self, y: int, x: int) -> list[tuple[int, int]]:
-        return [
-            (i, j)
-            for i, j in (
-                (y - 1, x - 1),
-                (y - 1, x),
-                (y - 1, x + 1),
-                (y, x - 1),
-                (y, x + 1),
-                (y + 1, x - 1),
-                (y + 1, x),
-                (y + 1, x + 1),
-            )
-            if 0 <= i < self._height and 0 <= j < self._width
-        ]
+        return self
 
     @property
     def value(self) -> int:
-        nt = sum(1 for r in self._acres for c in r if c == Area.TREES)
-        nl = sum(1 for r in self._acres for c in r if c == Area.LUMBERJACK)
-        return nt * nl
+        nt = np.count_nonzero(self._acres == Area.TREES)
+        nl = np.count_nonzero(self._acres == Area.LUMBERJACK)
+        return int(nt * nl)
+
+    @property
+    def fingerprint(self) -> int:
+        return fingerprint(self._acres.tobytes())
 
     def __str__(self) -> str:
-        return "\n".join("".join(r) for r in self._acres) + "\n"
+        return render(self._acres)
 
 
 def part1(data: Sequence[str]) -> int:
     area = Area.parse(data)
-    if verbose := logging.getLogger().isEnabledFor(logging.DEBUG):
+    if verbose := trace.enabled(logging.DEBUG):
         logging.debug("Initial state:")
         logging.debug(area)
 
@@ -93,30 +74,17 @@ def part1(data: Sequence[str]) -> int:
 
 def part2(data: Sequence[str], minutes: int = 1_000_000_000) -> int:
     area = Area.parse(data)
-
-    # Loop until finding a cycle
-    prev = {str(area): 0}
-    m = 0
-    for t in range(1, minutes + 1):
-        area.update()
-        s = str(area)
-        if s in prev:
-            c = prev[s]
-            m = (minutes - t) % (t - c)
-            break
-        prev[s] = t
-    else:
-        raise ValueError("Could not find a cycle")
-
-    # Loop the cycle until reaching the final state
-    for _ in range(m):
-        area.update()
-
-    return area.value
+    return fast_forward(
+        area,
+        Area.update,
+        minutes,
+        key=lambda a: a.fingerprint,
+        value=lambda a: a.value,
+    )
 
 
 def main() -> None:
-    logging.config.fileConfig("../logging.conf")
+    trace.configure()
 
     data = read_data(open(0))
 
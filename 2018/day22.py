@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 
+from array import array
 from collections.abc import Mapping, Set
 from enum import IntEnum
-from heapq import heappop, heappush
 from io import StringIO
-from typing import Final, NamedTuple, TextIO
+from typing import Final, TextIO
+
+from aoc import trace
+from aoc.pathfinding import UNREACHED, astar
 
 type Coord = tuple[int, int]
 
@@ -41,72 +44,59 @@ def parse_data(f: TextIO) -> tuple[int, Coord]:
     return depth, (tx, ty)
 
 
-class Region:
-    erosion: Final[int]
-    type: Final[RegionType]
+EROSION_MODULO: Final = 20183
 
-    def __init__(self, geo_index: int, depth: int):
-        self.erosion = (geo_index + depth) % 20183
-        self.type = RegionType(self.erosion % 3)
+# Search states pack the position and the tool in one int
+X_BITS: Final = 20
+X_MASK: Final = (1 << X_BITS) - 1
 
-    @property
-    def risk(self) -> int:
-        return self.type
-
-    def __str__(self) -> str:
-        match self.type:
-            case RegionType.ROCKY:
-                return "."
-            case RegionType.WET:
-                return "="
-            case RegionType.NARROW:
-                return "|"
+_REGION_TYPES: Final = tuple(RegionType)
+_SYMBOLS: Final = ".=|"
 
 
 class Cave:
-    type RegionMap = list[list[Region]]
+    """The erosion levels of the regions, computed as they are needed.
 
-    _data: Final[RegionMap]
-    _target: Final[Coord]
+    Each row is an array of 2-byte levels, and all the rows are extended
+    together, so the computed regions are a rectangle from the mouth.
+    """
 
-    def __init__(self, depth: int, target: Coord, *, extend: int = 200):
-        # 'extend' value chosen after trial and error for input data
-        width, height = target[0] + extend, target[1] + extend
+    _depth: Final[int]
+    _target: Final[Coord]
+    _rows: Final[list[array[int]]]
+    _width: int
 
-        self._data = Cave._init_regions((width, height, depth), target)
+    def __init__(self, depth: int, target: Coord):
+        self._depth = depth
         self._target = target
-
-    @staticmethod
-    def _init_regions(dimensions: tuple[int, int, int], target: Coord) -> RegionMap:
-        width, height, depth = dimensions
-        placeholder = Region(0, 0)
-
-        regions = [[placeholder] * width for _ in range(height)]
-
-        # Init top-left corner
-        regions[0][0] = Region(0, depth)
-
-        # Init top row
-        for x in range(1, width):
-            geo_index = x * 16807
-            regions[0][x] = Region(geo_index, depth)
-
-        # Init left column
-        for y in range(1, height):
-            geo_index = y * 48271
-            regions[y][0] = Region(geo_index, depth)
-
-        # Init rest of regions, including target
-        for y in range(1, height):
-            for x in range(1, width):
-                if (x, y) == target:
-                    regions[y][x] = Region(0, depth)
-                    continue
-                left, top = regions[y][x - 1], regions[y - 1][x]
-                geo_index = left.erosion * top.erosion
-                regions[y][x] = Region(geo_index, depth)
-
-        return regions
+        self._rows = []
+        self._width = 0
+        self._extend(target[0] + 1, target[1] + 1)
+
+    def _extend(self, width: int, height: int) -> None:
+        rows = self._rows
+        if width > self._width:
+            for y, row in enumerate(rows):
+                self._fill(row, y, width)
+            self._width = width
+        while len(rows) < height:
+            rows.append(array("H"))
+            self._fill(rows[-1], len(rows) - 1, self._width)
+
+    def _fill(self, row: array[int], y: int, width: int) -> None:
+        # Extend the row up to the width, after the row above
+        depth = self._depth
+        above = self._rows[y - 1]
+        for x in range(len(row), width):
+            if y == 0:
+                geo_index = x * 16807
+            elif x == 0:
+                geo_index = y * 48271
+            elif (x, y) == self._target:
+                geo_index = 0
+            else:
+                geo_index = row[x - 1] * above[x]
+            row.append((geo_index + depth) % EROSION_MODULO)
 
     @property
     def target(self) -> Coord:
@@ -118,89 +108,70 @@ class Cave:
 
     @property
     def width(self) -> int:
-        return len(self._data[0])
+        return self._width
 
     @property
     def height(self) -> int:
-        return len(self._data)
+        return len(self._rows)
 
     @property
     def risk(self) -> int:
-        return sum(
-            self[x, y].risk
-            for y in range(self.target[1] + 1)
-            for x in range(self.target[0] + 1)
-        )
+        tx, ty = self.target
+        return sum(e % 3 for row in self._rows[: ty + 1] for e in row[: tx + 1])
 
-    def __getitem__(self, pos: Coord) -> Region:
-        return self._data[pos[1]][pos[0]]
+    def __getitem__(self, pos: Coord) -> RegionType:
+        x, y = pos
+        if x >= self._width or y >= len(self._rows):
+            self._extend(max(x + 1, self._width), max(y + 1, len(self._rows)))
+        return _REGION_TYPES[self._rows[y][x] % 3]
 
     def __str__(self) -> str:
         buf = StringIO()
-        for y in range(self.height):
-            for x in range(self.width):
+        for y, row in enumerate(self._rows):
+            for x, erosion in enumerate(row):
                 match (x, y):
                     case (0, 0):
                         buf.write("M")
                     case self.target:
                         buf.write("T")
                     case _:
-                        buf.write(str(self._data[y][x]))
+                        buf.write(_SYMBOLS[erosion % 3])
             buf.write("\n")
         return buf.getvalue()
 
 
-def _dist(c1: Coord, c2: Coord) -> int:
-    return abs(c1[0] - c2[0]) + abs(c1[1] - c2[1])
-
-
-def _reachable_regions(cave: Cave, pos: Coord, tool: Tool) -> list[Coord]:
-    px, py = pos
-    return [
-        (x, y)
-        for x, y in ((px, py - 1), (px, py + 1), (px - 1, py), (px + 1, py))
-        if (x >= 0 and y >= 0) and cave[x, y].type in regions_for_tool[tool]
-    ]
-
-
-def _switch_tools(cave: Cave, pos: Coord, tool: Tool) -> list[Tool]:
-    return [t for t in tools_for_region[cave[pos].type] if t != tool]
-
-
 def rescue(cave: Cave) -> int:
-    class Move(NamedTuple):
-        heuristic: int
-        time: int
-        position: Coord
-        tool: Tool
-
-    queue: list[Move] = []
-    visited: dict[tuple[Coord, Tool], int] = {}
-
-    heappush(queue, Move(0, 0, cave.mouth, Tool.TORCH))
-    while queue:
-        _, time, pos, tool = heappop(queue)
-
-        current = pos, tool
-        if current == (cave.target, Tool.TORCH):
-            return time
-        if current in visited and visited[current] <= time:
-            continue
-        visited[current] = time
-
-        # Try reachable regions
-        for p in _reachable_regions(cave, pos, tool):
-            cost = time + 1
-            heur = cost + _dist(cave.target, p)
-            heappush(queue, Move(heur, cost, p, tool))
-
-        # Try switching tool
-        for t in _switch_tools(cave, pos, tool):
-            cost = time + 7
-            heur = cost + _dist(cave.target, pos)
-            heappush(queue, Move(heur, cost, pos, t))
-
-    raise AssertionError
+    # The states are ((y << X_BITS | x) << 2 | tool), for x < 2**X_BITS
+    regions = [regions_for_tool[t] for t in Tool]
+    tx, ty = cave.target
+
+    def step(state: int) -> list[tuple[int, int]]:
+        tool = state & 3
+        y, x = state >> (X_BITS + 2), (state >> 2) & X_MASK
+        allowed = regions[tool]
+        moves = [
+            ((ny << X_BITS | nx) << 2 | tool, 1)
+            for nx, ny in ((x, y - 1), (x - 1, y), (x + 1, y), (x, y + 1))
+            if nx >= 0 and ny >= 0 and cave[nx, ny] in allowed
+        ]
+        moves += [
+            (state - tool + t, 7) for t in tools_for_region[cave[x, y]] if t != tool
+        ]
+        return moves
+
+    def heuristic(state: int) -> int:
+        tool = state & 3
+        y, x = state >> (X_BITS + 2), (state >> 2) & X_MASK
+        return abs(x - tx) + abs(y - ty) + (7 if tool != Tool.TORCH else 0)
+
+    mx, my = cave.mouth
+    start = (my << X_BITS | mx) << 2 | Tool.TORCH
+    goal = (ty << X_BITS | tx) << 2 | Tool.TORCH
+    with trace.span("search"):
+        time = astar(None, [start], goal, step, heuristic)
+    if time == UNREACHED:
+        raise AssertionError
+    return time
 
 
 def part1(cave: Cave) -> int:
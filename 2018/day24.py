@@ -1,81 +1,40 @@
 #!/usr/bin/env python
 
 import logging
-import logging.config
 import re
-from collections.abc import Sequence, Set
+from collections.abc import Sequence
 from dataclasses import dataclass
 from itertools import count
-from typing import Final, Self, TextIO
+from typing import Final, TextIO
 
+from aoc import trace
 
-@dataclass(frozen=True)
-class Attributes:
-    hp: int
-    atk_dmg: int
-    atk_type: str
-    initiative: int
-    weak: Set[str]
-    immune: Set[str]
-
-
-class Group:
-    _id: Final[int]
-    _side: Final[str]
-    _units: int
-    _attr: Attributes
-
-    def __init__(self, id: int, side: str, units: int, attr: Attributes) -> None:
-        self._id = id
-        self._side = side
-        self._units = units
-        self._attr = attr
-
-    @property
-    def id(self) -> int:
-        return self._id
-
-    @property
-    def side(self) -> str:
-        return self._side
-
-    @property
-    def units(self) -> int:
-        return self._units
-
-    @property
-    def power(self) -> int:
-        return self._units * self._attr.atk_dmg
-
-    @property
-    def initiative(self) -> int:
-        return self._attr.initiative
-
-    def dmg(self, enemy: Self) -> int:
-        if self._attr.atk_type in enemy._attr.immune:
-            return 0
-        if self._attr.atk_type in enemy._attr.weak:
-            return 2 * self.power
-        return self.power
+IMMUNE_SYS: Final = 0
+INFECTION: Final = 1
 
-    def attack(self, enemy: Self) -> int:
-        killed = min(self.dmg(enemy) // enemy._attr.hp, enemy._units)
-        enemy._units -= killed
-        return killed
+type Group = int
 
-    def is_destroyed(self) -> bool:
-        return self._units <= 0
 
-    def __hash__(self) -> int:
-        return hash((self._id, self._side))
-
-    def _eq__(self, other: Self) -> int:
-        return (self._id, self._side) == (other._id, other._side)
+@dataclass(frozen=True)
+class Armies:
+    """The groups of both armies, as parallel tuples indexed by group.
 
+    The multiplier of the damage of each group against each other group (0
+    if immune, 2 if weak) is computed when parsing. The battles copy only
+    the units, which are the state that changes.
+    """
 
-type Army = list[Group]
+    names: tuple[str, str]
+    side: tuple[int, ...]
+    id: tuple[int, ...]
+    units: tuple[int, ...]
+    hp: tuple[int, ...]
+    atk_dmg: tuple[int, ...]
+    initiative: tuple[int, ...]
+    multiplier: tuple[tuple[int, ...], ...]
 
-type Target = tuple[Group, Group]
+    def __len__(self) -> int:
+        return len(self.units)
 
 
 def parse_data(f: TextIO) -> tuple[str, str]:
@@ -83,7 +42,7 @@ def parse_data(f: TextIO) -> tuple[str, str]:
     return inmune, infection
 
 
-def parse_army(data: str, boost: int = 0) -> Army:
+def parse_armies(data: tuple[str, str]) -> Armies:
     pattern = re.compile(
         r"(?P<units>\d+) units each with (?P<hp>\d+) hit points "
         r"(?:\((?P<effects>.*)\) )?"
@@ -91,154 +50,185 @@ def parse_army(data: str, boost: int = 0) -> Army:
         r"damage at initiative (?P<ini>\d+)"
     )
 
-    def parse_effects(match_group: str | None) -> tuple[Set[str], Set[str]]:
-        effects: dict[str, Set[str]] = {"weak": set(), "immune": set()}
+    def parse_effects(match_group: str | None) -> dict[str, set[str]]:
+        effects: dict[str, set[str]] = {"weak": set(), "immune": set()}
         if match_group:
             for group in match_group.split("; "):
                 k, v = group.split(" to ")
                 effects[k] = set(v.split(", "))
-        return effects["weak"], effects["immune"]
+        return effects
 
-    def make_group(i: int, match: re.Match[str]) -> Group:
-        units = int(match.group("units"))
-        attr = Attributes(
-            int(match.group("hp")),
-            int(match.group("atk_dmg")) + boost,
-            match.group("atk_type"),
-            int(match.group("ini")),
-            *parse_effects(match.group("effects")),
-        )
-        return Group(i + 1, name, units, attr)
+    names = []
+    groups = []
+    for side, army in enumerate(data):
+        name, *lines = army.splitlines()
+        names.append(name.rstrip(":"))
+        matches = [m for l in lines if (m := pattern.match(l))]
+        groups += [(side, i, m) for i, m in enumerate(matches, 1)]
 
-    name, *groups = data.splitlines()
-    name = name.rstrip(":")
+    atk_types = [m.group("atk_type") for *_, m in groups]
+    effects = [parse_effects(m.group("effects")) for *_, m in groups]
 
-    return [make_group(i, m) for i, g in enumerate(groups) if (m := pattern.match(g))]
+    def multiplier(atk_type: str, defender: dict[str, set[str]]) -> int:
+        if atk_type in defender["immune"]:
+            return 0
+        if atk_type in defender["weak"]:
+            return 2
+        return 1
+
+    return Armies(
+        names=(names[0], names[1]),
+        side=tuple(side for side, *_ in groups),
+        id=tuple(i for _, i, _ in groups),
+        units=tuple(int(m.group("units")) for *_, m in groups),
+        hp=tuple(int(m.group("hp")) for *_, m in groups),
+        atk_dmg=tuple(int(m.group("atk_dmg")) for *_, m in groups),
+        initiative=tuple(int(m.group("ini")) for *_, m in groups),
+        multiplier=tuple(tuple(multiplier(t, e) for e in effects) for t in atk_types),
+    )
 
 
-def _log_groups(immune_sys: Army, infection: Army) -> None:
-    def show(side: str, groups: Army) -> None:
+def _log_groups(
+    armies: Armies, alive: Sequence[list[Group]], units: Sequence[int]
+) -> None:
+    def show(side: str, groups: list[Group]) -> None:
         logging.info(f"{side}:")
         if groups:
             for g in groups:
-                logging.info(f"Group {g.id} contains {g.units} units")
+                logging.info(f"Group {armies.id[g]} contains {units[g]} units")
         else:
             logging.info("No groups remain.")
 
-    show("Immune System", immune_sys)
-    show("Infection", infection)
+    show("Immune System", alive[IMMUNE_SYS])
+    show("Infection", alive[INFECTION])
     logging.info("")
 
 
-def _log_targets(g: Group, enemies: Set[Group]) -> None:
-    for e in sorted(enemies, key=lambda e: e.id):
-        if (d := g.dmg(e)) > 0:
-            logging.info(
-                f"{g.side} group {g.id} would deal defending group {e.id} "
-                f"{d} damage"
-            )
+def battle(armies: Armies, boost: int = 0) -> tuple[bool | None, int]:
+    """The battle with the immune system attack boosted.
 
+    Returns whether the immune system wins, or None if the battle stalls
+    because no units are killed in a fight, and the units of the winner.
+    """
+    side, ids, hp, initiative = armies.side, armies.id, armies.hp, armies.initiative
+    multiplier = armies.multiplier
 
-def _log_attack(group: Group, target: Group, killed: int) -> None:
-    logging.info(
-        f"{group.side} group {group.id} attacks "
-        f"defending group {target.id}, killing {killed} "
-        f"unit{'' if killed == 1 else 's'}"
-    )
+    groups = range(len(armies))
+    units = list(armies.units)
+    atk = [
+        a + boost if side[g] == IMMUNE_SYS else a for g, a in enumerate(armies.atk_dmg)
+    ]
+    alive = [[g for g in groups if side[g] == s] for s in (IMMUNE_SYS, INFECTION)]
+    by_initiative = sorted(groups, key=lambda g: initiative[g], reverse=True)
+    targets = [-1] * len(armies)
 
+    if verbose := trace.enabled(logging.INFO):
+        _log_groups(armies, alive, units)
 
-def _select_targets(immune_sys: Army, infection: Army) -> list[Target]:
-    verbose = logging.getLogger().isEnabledFor(logging.INFO)
+    def power(g: Group) -> int:
+        return units[g] * atk[g]
 
-    all_targets = []
-
-    def select(army: Army, enemies: Sequence[Group]) -> list[Target]:
-        targets = []
-        untargeted = set(enemies)
-        for group in sorted(army, key=lambda g: (g.power, g.initiative), reverse=True):
+    def select(army: list[Group], enemies: list[Group]) -> None:
+        untargeted = enemies.copy()
+        for g in sorted(army, key=lambda g: (power(g), initiative[g]), reverse=True):
+            targets[g] = -1
             if not untargeted:
-                break
+                continue
+            mult = multiplier[g]
             if verbose:
-                _log_targets(group, untargeted)
-            target = max(
-                untargeted, key=lambda e: (group.dmg(e), e.power, e.initiative)
-            )
-            if group.dmg(target) > 0:
-                targets.append((group, target))
+                for e in untargeted:
+                    if mult[e]:
+                        logging.info(
+                            f"{armies.names[side[g]]} group {ids[g]} would deal "
+                            f"defending group {ids[e]} {mult[e] * power(g)} damage"
+                        )
+            target = max(untargeted, key=lambda e: (mult[e], power(e), initiative[e]))
+            if mult[target]:
+                targets[g] = target
                 untargeted.remove(target)
-        return targets
-
-    all_targets += select(infection, immune_sys)
-    all_targets += select(immune_sys, infection)
-
-    logging.info("")
-
-    return all_targets
-
-
-def _attack_targets(
-    immune_sys: Army, infection: Army, targets: Sequence[Target]
-) -> int:
-    verbose = logging.getLogger().isEnabledFor(logging.INFO)
-
-    total_killed = 0
-
-    for group, target in sorted(targets, key=lambda t: t[0].initiative, reverse=True):
-        if group.is_destroyed():
-            # Group was destroyed by a previous attack
-            continue
-        killed = group.attack(target)
-        total_killed += killed
-        if verbose:
-            _log_attack(group, target, killed)
-        if target.is_destroyed():
-            if target in immune_sys:
-                immune_sys.remove(target)
-            else:
-                infection.remove(target)
-
-    logging.info("")
-
-    return total_killed
 
+    fights = 0
+    with trace.span("battle"):
+        while alive[IMMUNE_SYS] and alive[INFECTION]:
+            fights += 1
+            select(alive[INFECTION], alive[IMMUNE_SYS])
+            select(alive[IMMUNE_SYS], alive[INFECTION])
+            if verbose:
+                logging.info("")
+
+            destroyed = 0
+            for g in by_initiative:
+                # Group could have been destroyed by a previous attack
+                if (t := targets[g]) < 0 or not units[g]:
+                    continue
+                killed = min(power(g) * multiplier[g][t] // hp[t], units[t])
+                units[t] -= killed
+                destroyed += killed
+                if verbose:
+                    logging.info(
+                        f"{armies.names[side[g]]} group {ids[g]} attacks "
+                        f"defending group {ids[t]}, killing {killed} "
+                        f"unit{'' if killed == 1 else 's'}"
+                    )
+            if verbose:
+                logging.info("")
 
-def battle(immune_sys: Army, infection: Army) -> tuple[bool | None, int]:
-    if verbose := logging.getLogger().isEnabledFor(logging.INFO):
-        _log_groups(immune_sys, infection)
+            # Part 2 would loop forever without this check
+            if destroyed == 0:
+                trace.count("fights", fights)
+                return None, 0
 
-    while immune_sys and infection:
-        targets = _select_targets(immune_sys, infection)
-        destroyed = _attack_targets(immune_sys, infection, targets)
-        # Part 2 would loop forever without this check
-        if destroyed == 0:
-            return None, 0
-        if verbose:
-            logging.info("")
-            _log_groups(immune_sys, infection)
+            alive = [[g for g in army if units[g]] for army in alive]
+            if verbose:
+                logging.info("")
+                _log_groups(armies, alive, units)
+    trace.count("fights", fights)
 
-    winner = max(immune_sys, infection, key=len)
-    return bool(immune_sys), sum(g.units for g in winner)
+    winner = max(alive, key=len)
+    return bool(alive[IMMUNE_SYS]), sum(units[g] for g in winner)
 
 
 def part1(data: tuple[str, str]) -> int:
-    immune_sys = parse_army(data[0])
-    infection = parse_army(data[1])
-    _, units = battle(immune_sys, infection)
+    _, units = battle(parse_armies(data))
     return units
 
 
 def part2(data: tuple[str, str]) -> int:
-    for boost in count(1):
-        immune_sys = parse_army(data[0], boost=boost)
-        infection = parse_army(data[1])
-        survived, units = battle(immune_sys, infection)
-        if survived:
-            return units
-    raise AssertionError
+    armies = parse_armies(data)
+    results: dict[int, int | None] = {}
+
+    def survives(boost: int) -> bool:
+        # Stalled battles are losses for the immune system
+        if boost not in results:
+            trace.count("battles")
+            survived, units = battle(armies, boost)
+            results[boost] = units if survived else None
+        return results[boost] is not None
+
+    # Double the boost until the immune system wins, then search the lowest one
+    lo, hi = 0, 1
+    while not survives(hi):
+        lo, hi = hi, 2 * hi
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if survives(mid):
+            hi = mid
+        else:
+            lo = mid
+
+    # The search assumes that a bigger boost never makes the immune system
+    # lose, which is not always true, as some boosts end in a stalemate
+    if survives(hi - 1) or not survives(hi + 1):
+        logging.warning("The immune system can lose with a bigger boost, trying all")
+        hi = next(boost for boost in count() if survives(boost))
+
+    units = results[hi]
+    assert units is not None
+    return units
 
 
 def main() -> None:
-    logging.config.fileConfig("../logging.conf")
+    trace.configure()
 
     data = parse_data(open(0))
 
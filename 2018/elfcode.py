@@ -0,0 +1,401 @@
+import math
+import re
+from collections.abc import Callable, Mapping, Sequence, Set
+from typing import Any, Final, NamedTuple
+
+N: Final = 6
+
+type Registers = list[int]
+type Instruction = tuple[str, int, int, int]
+
+type OpCodeFn = Callable[[Registers, int, int, int], None]
+type Op = Callable[[Registers], None]
+type Decoder = Callable[[int, int, int], Op]
+
+# Return True when the instruction was replaced, False to execute it normally
+type Accelerator = Callable[[Registers], bool]
+type Trace = Callable[[int, Registers, Instruction, Registers], None]
+type Compiled = Callable[[Registers], None]
+
+# Pattern operands: a literal value, "_" for any value, "ip" for the ip register,
+# an uppercase name for a register, a lowercase name for an immediate value,
+# or "@k" for the address k instructions after the start of the pattern
+type Operand = int | str
+type Pattern = Sequence[tuple[str, Operand, Operand, Operand]]
+
+# Value stored in register C by each instruction
+EXPRESSIONS: Final[Mapping[str, str]] = {
+    "addr": "r[a] + r[b]",
+    "addi": "r[a] + b",
+    "mulr": "r[a] * r[b]",
+    "muli": "r[a] * b",
+    "banr": "r[a] & r[b]",
+    "bani": "r[a] & b",
+    "borr": "r[a] | r[b]",
+    "bori": "r[a] | b",
+    "setr": "r[a]",
+    "seti": "a",
+    "gtir": "1 if a > r[b] else 0",
+    "gtri": "1 if r[a] > b else 0",
+    "gtrr": "1 if r[a] > r[b] else 0",
+    "eqir": "1 if a == r[b] else 0",
+    "eqri": "1 if r[a] == b else 0",
+    "eqrr": "1 if r[a] == r[b] else 0",
+}
+
+
+def _compile(expr: str) -> tuple[OpCodeFn, Decoder]:
+    # Generic function with the arguments given on every call,
+    # and decoder returning a function specialised for fixed arguments
+    source = (
+        f"def fn(r, a, b, c):\n"
+        f"    r[c] = {expr}\n"
+        f"\n"
+        f"def decode(a, b, c):\n"
+        f"    def op(r):\n"
+        f"        r[c] = {expr}\n"
+        f"    return op\n"
+    )
+    namespace: dict[str, Any] = {}
+    exec(source, namespace)
+    return namespace["fn"], namespace["decode"]
+
+
+_compiled: Final = {name: _compile(expr) for name, expr in EXPRESSIONS.items()}
+
+opcodes_fn: Final[Mapping[str, OpCodeFn]] = {k: v[0] for k, v in _compiled.items()}
+_decoders: Final[Mapping[str, Decoder]] = {k: v[1] for k, v in _compiled.items()}
+
+
+class Program(NamedTuple):
+    ip: int | None
+    instructions: list[Instruction]
+
+
+class Halt(Exception):  # noqa: N818
+    """Raised by an accelerator to stop the program with a result."""
+
+    def __init__(self, value: int):
+        super().__init__(value)
+        self.value = value
+
+
+def read_program(data: Sequence[str]) -> Program:
+    def parse_instruction(line: str) -> Instruction:
+        op, *args = line.split()
+        a, b, c = map(int, args)
+        return (op, a, b, c)
+
+    ip = int(data[0].split()[-1])
+    ins = [parse_instruction(l) for l in data[1:] if l.strip()]
+
+    return Program(ip, ins)
+
+
+# Loop idioms replaced by the compiler
+
+_DIVIDE: Final[Pattern] = (
+    # T = 0
+    # while (T + 1) * k <= S do
+    #     T += 1
+    ("seti", 0, "_", "T"),
+    ("addi", "T", 1, "U"),
+    ("muli", "U", "k", "U"),
+    ("gtrr", "U", "S", "U"),
+    ("addr", "U", "ip", "ip"),
+    ("addi", "ip", 1, "ip"),
+    ("seti", "@8", "_", "ip"),
+    ("addi", "T", 1, "T"),
+    ("seti", "@0", "_", "ip"),
+)
+
+_SUM_OF_DIVISORS: Final[Pattern] = (
+    # for A in 1..N do
+    #     for B in 1..N do
+    #         if A * B == N then
+    #             S += A
+    ("seti", 1, "_", "A"),
+    ("seti", 1, "_", "B"),
+    ("mulr", "A", "B", "T"),
+    ("eqrr", "T", "N", "T"),
+    ("addr", "T", "ip", "ip"),
+    ("addi", "ip", 1, "ip"),
+    ("addr", "A", "S", "S"),
+    ("addi", "B", 1, "B"),
+    ("gtrr", "B", "N", "T"),
+    ("addr", "ip", "T", "ip"),
+    ("seti", "@1", "_", "ip"),
+    ("addi", "A", 1, "A"),
+    ("gtrr", "A", "N", "T"),
+    ("addr", "T", "ip", "ip"),
+    ("seti", "@0", "_", "ip"),
+)
+
+_COMMUTATIVE: Final = frozenset(["addr", "mulr", "banr", "borr", "eqrr"])
+
+
+def _match(pattern: Pattern, program: Program, start: int) -> dict[str, int] | None:
+    instructions = program.instructions
+    if start + len(pattern) > len(instructions):
+        return None
+
+    env: dict[str, int] = {}
+
+    def bind(operand: Operand, value: int) -> bool:
+        if isinstance(operand, int):
+            return operand == value
+        if operand == "_":
+            return True
+        if operand == "ip":
+            return value == program.ip
+        if operand.startswith("@"):
+            return value == start + int(operand[1:])
+        if operand in env:
+            return env[operand] == value
+        # Each register variable is a different non-ip register
+        if operand.isupper() and (
+            value == program.ip or any(env[v] == value for v in env if v.isupper())
+        ):
+            return False
+        env[operand] = value
+        return True
+
+    for (p_op, *p_args), (op, *args) in zip(
+        pattern, instructions[start:], strict=False
+    ):
+        if p_op != op:
+            return None
+        saved = dict(env)
+        if all(bind(p, v) for p, v in zip(p_args, args, strict=True)):
+            continue
+        # Try again with swapped operands
+        env = saved
+        a, b, c = args
+        if op not in _COMMUTATIVE or not all(
+            bind(p, v) for p, v in zip(p_args, (b, a, c), strict=True)
+        ):
+            return None
+
+    return env
+
+
+def _sum_of_divisors(n: int) -> int:
+    # Like the loops of the idiom, which find no divisors of n <= 0
+    if n <= 0:
+        return 0
+    return sum(
+        f for i in range(1, math.isqrt(n) + 1) if n % i == 0 for f in {i, n // i}
+    )
+
+
+def _idiom(program: Program, start: int) -> list[str] | None:
+    if (env := _match(_DIVIDE, program, start)) is not None and env["k"] > 0:
+        t, u, s = (f"r{env[v]}" for v in "TUS")
+        return [
+            f"{t} = max({s} // {env['k']}, 0)",
+            f"{u} = 1",
+            f"pc = {start + len(_DIVIDE)}",
+        ]
+
+    if (env := _match(_SUM_OF_DIVISORS, program, start)) is not None:
+        a, b, t, n, s = (f"r{env[v]}" for v in "ABTNS")
+        return [
+            f"{s} += _sum_of_divisors({n})",
+            f"{a} = {b} = max({n}, 1) + 1",
+            f"{t} = 1",
+            f"pc = {start + len(_SUM_OF_DIVISORS)}",
+        ]
+
+    return None
+
+
+_OPERAND_RE: Final = re.compile(r"r\[([ab])\]|\b([ab])\b")
+
+
+def _expression(instruction: Instruction, ip: int, pc: int) -> str:
+    op, a, b, _ = instruction
+
+    def operand(m: re.Match[str]) -> str:
+        if m[1] is not None:
+            r = a if m[1] == "a" else b
+            # The ip register always holds the address of the instruction
+            return str(pc) if r == ip else f"r{r}"
+        return str(a if m[2] == "a" else b)
+
+    return _OPERAND_RE.sub(operand, EXPRESSIONS[op])
+
+
+def generate_source(
+    program: Program, hooks: Set[int] = frozenset(), *, idioms: bool = True
+) -> str:
+    """Translate the program into a Python function run(r) -> None.
+
+    Registers are kept in local variables. Each address is the entry of a
+    block that runs the following instructions until one of them writes the
+    ip register, which becomes a jump to the next block. The addresses with
+    hooks call hooks[address] with the registers, like VM accelerators.
+    """
+    ip = program.ip
+    if ip is None:
+        raise ValueError("compiled programs need an ip register")
+
+    n = len(program.instructions)
+    regs = ", ".join(f"r{i}" for i in range(N))
+    hook_regs = ", ".join("pc" if i == ip else f"r{i}" for i in range(N))
+    replaced = {k: lines for k in range(n) if idioms and (lines := _idiom(program, k))}
+
+    def block(start: int) -> list[str]:
+        lines = []
+        if start in hooks:
+            lines += [
+                f"regs = [{hook_regs}]",
+                f"replaced = hooks[{start}](regs)",
+                f"{regs} = regs",
+                "if replaced:",
+                f"    pc = regs[{ip}] + 1",
+                "    continue",
+            ]
+        if start in replaced:
+            return lines + replaced[start]
+
+        for pc in range(start, n):
+            if pc != start and (pc in hooks or pc in replaced):
+                break
+            instruction = program.instructions[pc]
+            expr = _expression(instruction, ip, pc)
+            if instruction[-1] == ip:
+                return [*lines, f"pc = ({expr}) + 1"]
+            lines.append(f"r{instruction[-1]} = {expr}")
+        else:
+            pc = n
+        return [*lines, f"pc = {pc}"]
+
+    def dispatch(lo: int, hi: int) -> list[str]:
+        # Binary search of the block for the current address
+        if hi - lo == 1:
+            return block(lo)
+        mid = (lo + hi) // 2
+        return [
+            f"if pc < {mid}:",
+            *(f"    {l}" for l in dispatch(lo, mid)),
+            "else:",
+            *(f"    {l}" for l in dispatch(mid, hi)),
+        ]
+
+    body = [
+        f"{regs} = r",
+        f"pc = r{ip}",
+        f"while 0 <= pc < {n}:",
+        *(f"    {l}" for l in dispatch(0, n)),
+        f"r[:] = [{hook_regs}]",
+    ]
+    return "def run(r):\n" + "".join(f"    {l}\n" for l in body)
+
+
+def compile_program(
+    program: Program,
+    hooks: Mapping[int, Accelerator] | None = None,
+    *,
+    idioms: bool = True,
+) -> Compiled:
+    hooks = hooks or {}
+    source = generate_source(program, hooks.keys(), idioms=idioms)
+    namespace: dict[str, Any] = {"hooks": hooks, "_sum_of_divisors": _sum_of_divisors}
+    exec(compile(source, "<elfcode>", "exec"), namespace)
+    run: Compiled = namespace["run"]
+    return run
+
+
+class VM:
+    program: Final[Program]
+    counts: list[int]
+
+    def __init__(self, program: Program):
+        self.program = program
+        self.counts = [0] * len(program.instructions)
+        # Pre-decoded instructions
+        self._code = [_decoders[op](a, b, c) for op, a, b, c in program.instructions]
+        self._hooks: list[Accelerator | None] = [None] * len(self._code)
+        self._compiled: dict[bool, Compiled] = {}
+
+    def accelerate(self, addr: int, fn: Accelerator) -> None:
+        """Run fn every time the instruction pointer reaches addr.
+
+        The accelerator can replace a whole loop by modifying the registers,
+        including the ip register to jump after the loop.
+        """
+        if self.program.ip is None:
+            raise ValueError("accelerators need an ip register")
+        self._hooks[addr] = fn
+        self._compiled.clear()
+
+    def compiled(self, *, idioms: bool = True) -> Compiled:
+        """Compile the program into a Python function, once.
+
+        With idioms, known loops (sum of divisors, division) are replaced
+        by their result.
+        """
+        if idioms not in self._compiled:
+            hooks = {k: fn for k, fn in enumerate(self._hooks) if fn is not None}
+            self._compiled[idioms] = compile_program(self.program, hooks, idioms=idioms)
+        return self._compiled[idioms]
+
+    def run(
+        self,
+        regs: Registers | None = None,
+        *,
+        jit: bool = False,
+        profile: bool = False,
+        trace: Trace | None = None,
+    ) -> Registers:
+        if regs is None:
+            regs = [0] * N
+        if self.program.ip is None:
+            for op in self._code:
+                op(regs)
+        elif jit:
+            if profile or trace is not None:
+                raise ValueError("compiled programs cannot be profiled or traced")
+            self.compiled()(regs)
+        elif profile or trace is not None:
+            self._run_instrumented(regs, self.program.ip, trace)
+        else:
+            self._run(regs, self.program.ip)
+        return regs
+
+    def _run(self, regs: Registers, ip: int) -> None:
+        code = self._code
+        hooks = self._hooks
+        n = len(code)
+
+        pc = regs[ip]
+        while 0 <= pc < n:
+            hook = hooks[pc]
+            if hook is None or not hook(regs):
+                code[pc](regs)
+            pc = regs[ip] + 1
+            regs[ip] = pc
+
+    def _run_instrumented(self, regs: Registers, ip: int, trace: Trace | None) -> None:
+        code = self._code
+        hooks = self._hooks
+        counts = self.counts
+        instructions = self.program.instructions
+        n = len(code)
+
+        pc = regs[ip]
+        while 0 <= pc < n:
+            counts[pc] += 1
+            hook = hooks[pc]
+            if hook is None or not hook(regs):
+                prev = regs[:] if trace is not None else regs
+                code[pc](regs)
+                if trace is not None:
+                    trace(pc, prev, instructions[pc], regs)
+            pc = regs[ip] + 1
+            regs[ip] = pc
+
+    def hot_spots(self, k: int = 5) -> list[tuple[int, int]]:
+        """Most executed instructions (address and count) in profiled runs."""
+        ranked = sorted(enumerate(self.counts), key=lambda e: e[1], reverse=True)
+        return [(addr, count) for addr, count in ranked[:k] if count > 0]
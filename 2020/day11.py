@@ -1,17 +1,29 @@
 #!/usr/bin/env python
 
 import logging
-import logging.config
-from collections.abc import Callable, Iterator
+from collections.abc import Callable
 from enum import Enum, StrEnum
-from itertools import count, islice, product
 from typing import Final, TextIO
 
-type Layout = list[list[str]]
+import numpy as np
+
+from aoc import trace
+from aoc.automaton import (
+    Counts,
+    Grid,
+    LineOfSight,
+    Mask,
+    adjacent_counts,
+    cell,
+    parse_grid,
+    render,
+)
+
+type Layout = list[str]
 
 
 def read_data(f: TextIO) -> Layout:
-    return [list(l.rstrip()) for l in f]
+    return [l.rstrip() for l in f]
 
 
 class Position(StrEnum):
@@ -26,83 +38,48 @@ class Strategy(Enum):
 
 
 class Seats:
-    _layout: Layout
-    _rows: Final[int]
-    _cols: Final[int]
+    _layout: Grid
+    _seats: Final[Mask]
 
-    _update_fn: Callable[[int, int], Iterator[tuple[int, int]]]
+    _count_fn: Callable[[Mask], Counts]
     _tolerance: Final[int]
 
     def __init__(self, layout: Layout, strategy: Strategy, tolerance: int):
-        self._layout = [r[:] for r in layout]
-        self._rows = len(layout)
-        self._cols = len(layout[0])
+        self._layout = parse_grid(layout)
+        self._seats = self._layout != cell(Position.FLOOR)
 
         match strategy:
             case Strategy.ADJACENT:
-                self._update_fn = self._adjacent_seats
+                self._count_fn = adjacent_counts
             case Strategy.VISIBLE:
-                self._update_fn = self._visible_seats
+                self._count_fn = LineOfSight(self._seats).counts
         self._tolerance = tolerance
 
-        if logging.getLogger().isEnabledFor(logging.INFO):
+        if trace.enabled(logging.INFO):
             logging.info(self)
 
     def update(self) -> bool:
-        updated = [r[:] for r in self._layout]
-        changed = False
-
-        for i in range(self._rows):
-            for j in range(self._cols):
-                match (self._layout[i][j], self._count_seats(i, j)):
-                    case (Position.EMPTY, 0):
-                        updated[i][j] = Position.OCCUPIED
-                        changed = True
-                    case (Position.OCCUPIED, n) if n >= self._tolerance:
-                        updated[i][j] = Position.EMPTY
-                        changed = True
-                    case _:
-                        pass
-        self._layout = updated
-
-        if logging.getLogger().isEnabledFor(logging.INFO) and changed:
+        occupied = self._layout == cell(Position.OCCUPIED)
+        counts = self._count_fn(occupied)
+
+        sit = self._seats & ~occupied & (counts == 0)
+        leave = occupied & (counts >= self._tolerance)
+        changed = bool(sit.any() or leave.any())
+
+        self._layout = self._layout.copy()
+        self._layout[sit] = cell(Position.OCCUPIED)
+        self._layout[leave] = cell(Position.EMPTY)
+
+        if trace.enabled(logging.INFO) and changed:
             logging.info(self)
 
         return not changed
 
     def occupied(self) -> int:
-        return sum(1 for r in self._layout for s in r if s == Position.OCCUPIED)
-
-    def _count_seats(self, r: int, c: int) -> int:
-        return sum(
-            1
-            for i, j in self._update_fn(r, c)
-            if self._layout[i][j] == Position.OCCUPIED
-        )
-
-    _directions: Final = frozenset(product(range(-1, 2), range(-1, 2))) - {(0, 0)}
-
-    def _adjacent_seats(self, r: int, c: int) -> Iterator[tuple[int, int]]:
-        for di, dj in Seats._directions:
-            i, j = r + di, c + dj
-            if self._is_valid(i, j) and self._layout[i][j] != Position.FLOOR:
-                yield (i, j)
-
-    def _visible_seats(self, r: int, c: int) -> Iterator[tuple[int, int]]:
-        for di, dj in Seats._directions:
-            it = zip(count(r, di), count(c, dj))
-            for i, j in islice(it, 1, None):
-                if not self._is_valid(i, j):
-                    break
-                if self._layout[i][j] != Position.FLOOR:
-                    yield (i, j)
-                    break
-
-    def _is_valid(self, r: int, c: int) -> bool:
-        return 0 <= r < self._rows and 0 <= c < self._cols
+        return int(np.count_nonzero(self._layout == cell(Position.OCCUPIED)))
 
     def __str__(self) -> str:
-        return "\n".join("".join(s for s in r) for r in self._layout) + "\n"
+        return render(self._layout)
 
 
 def part1(layout: Layout) -> int:
@@ -120,7 +97,7 @@ def part2(layout: Layout) -> int:
 
 
 def main() -> None:
-    logging.config.fileConfig("../logging.conf")
+    trace.configure()
 
     data = read_data(open(0))
 
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+from array import array
 from collections.abc import Sequence
 from typing import TextIO
 
@@ -9,10 +10,18 @@ def parse_data(f: TextIO) -> list[int]:
 
 
 def find_number(starting: Sequence[int], turns: int) -> int:
-    prev = {n: i + 1 for i, n in enumerate(starting)}
+    # The last turn of each number (0 if not spoken yet), indexed by number.
+    # A spoken number is always less than the number of turns.
+    size = max(turns, max(starting) + 1)
+    prev = array("I", [0]) * size
+    for i, n in enumerate(starting[:-1], 1):
+        prev[n] = i
+
     last = starting[-1]
     for i in range(len(starting), turns):
-        prev[last], last = i, (i - prev[last] if last in prev else 0)
+        turn = prev[last]
+        prev[last] = i
+        last = i - turn if turn else 0
     return last
 
 
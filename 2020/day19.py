@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
-from collections.abc import Sequence
+import re
+from collections.abc import Callable, Iterable, Sequence
 from typing import TextIO
 
 type Rule = str | list[list[int]]
@@ -25,28 +26,130 @@ def parse_data(f: TextIO) -> tuple[Rules, list[str]]:
     return rules, messages
 
 
-def match_message(msg: str, rules: Rules, rule_id: int = 0) -> bool:
-    last = len(msg) - 1
-    queue = [(0, [rule_id])]
-    while queue:
-        i, seq = queue.pop()
-        current = rules[seq[0]]
-        if isinstance(current, str):
-            if msg[i] == current:
-                if i == last:
-                    if len(seq) == 1:
-                        return True
-                else:
-                    if len(seq) > 1:
-                        queue.append((i + 1, seq[1:]))
-        else:
-            for s in reversed(current):
-                queue.append((i, s + seq[1:]))
-    return False
+class Grammar:
+    """The rules compiled once, to match any number of messages.
+
+    Rules without recursion have finite languages, and are compiled into
+    regular expressions. Rules with recursion are parsed from the end
+    positions of their subrules at each start position of a message,
+    memoised per message.
+    """
+
+    _rules: Rules
+    _regular: set[int]
+    _sources: dict[int, str]
+    _patterns: dict[int, re.Pattern[str]]
+    _lengths: dict[int, frozenset[int]]
+
+    def __init__(self, rules: Rules):
+        self._rules = rules
+        self._regular = _regular_rules(rules)
+        self._sources = {}
+        self._patterns = {}
+        self._lengths = {}
+
+    def _source(self, rule_id: int) -> str:
+        if (source := self._sources.get(rule_id)) is None:
+            rule = self._rules[rule_id]
+            if isinstance(rule, str):
+                source = re.escape(rule)
+            else:
+                alts = ["".join(self._source(r) for r in seq) for seq in rule]
+                source = alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+            self._sources[rule_id] = source
+        return source
+
+    def _pattern(self, rule_id: int) -> re.Pattern[str]:
+        if (pattern := self._patterns.get(rule_id)) is None:
+            pattern = self._patterns[rule_id] = re.compile(self._source(rule_id))
+        return pattern
+
+    def _length(self, rule_id: int) -> frozenset[int]:
+        # The lengths of the messages of a regular rule
+        if (lengths := self._lengths.get(rule_id)) is None:
+            rule = self._rules[rule_id]
+            if isinstance(rule, str):
+                lengths = frozenset([len(rule)])
+            else:
+                lengths = frozenset()
+                for seq in rule:
+                    sums = {0}
+                    for r in seq:
+                        sums = {a + b for a in sums for b in self._length(r)}
+                    lengths |= sums
+            self._lengths[rule_id] = lengths
+        return lengths
+
+    def match(self, msg: str, rule_id: int = 0) -> bool:
+        if rule_id in self._regular:
+            return self._pattern(rule_id).fullmatch(msg) is not None
+        return len(msg) in self._parser(msg)(rule_id, 0)
+
+    def count(self, messages: Iterable[str], rule_id: int = 0) -> int:
+        if rule_id in self._regular:
+            fullmatch = self._pattern(rule_id).fullmatch
+            return sum(1 for m in messages if fullmatch(m))
+        return sum(1 for m in messages if self.match(m, rule_id))
+
+    def _parser(self, msg: str) -> Callable[[int, int], frozenset[int]]:
+        rules = self._rules
+        regular = self._regular
+        memo: dict[tuple[int, int], frozenset[int] | None] = {}
+        size = len(msg)
+
+        def ends(rule_id: int, start: int) -> frozenset[int]:
+            # The end positions of the matches of the rule from start
+            key = rule_id, start
+            if key in memo:
+                if (found := memo[key]) is None:
+                    raise ValueError(f"left-recursive rule: {rule_id}")
+                return found
+            memo[key] = None
+
+            rule = rules[rule_id]
+            if isinstance(rule, str) or rule_id in regular:
+                match = self._pattern(rule_id).fullmatch
+                found = frozenset(
+                    end
+                    for n in self._length(rule_id)
+                    if (end := start + n) <= size and match(msg, start, end)
+                )
+            else:
+                found = frozenset()
+                for seq in rule:
+                    positions = {start}
+                    for r in seq:
+                        after: set[int] = set()
+                        for p in positions:
+                            after |= ends(r, p)
+                        positions = after
+                    found |= positions
+
+            memo[key] = found
+            return found
+
+        return ends
+
+
+def _regular_rules(rules: Rules) -> set[int]:
+    # The rules that do not reach a cycle of rules
+    regular: dict[int, bool] = {}
+
+    def visit(rule_id: int) -> bool:
+        if rule_id not in regular:
+            # A rule reached again while visiting its subrules is recursive
+            regular[rule_id] = False
+            rule = rules[rule_id]
+            regular[rule_id] = isinstance(rule, str) or all(
+                visit(r) for seq in rule for r in seq
+            )
+        return regular[rule_id]
+
+    return {r for r in rules if visit(r)}
 
 
 def part1(rules: Rules, messages: Sequence[str]) -> int:
-    return sum(1 for m in messages if match_message(m, rules))
+    return Grammar(rules).count(messages)
 
 
 def part2(rules: Rules, messages: Sequence[str]) -> int:
@@ -54,7 +157,7 @@ def part2(rules: Rules, messages: Sequence[str]) -> int:
     rules[8] = [[42], [42, 8]]
     rules[11] = [[42, 31], [42, 11, 31]]
 
-    return sum(1 for m in messages if match_message(m, rules))
+    return Grammar(rules).count(messages)
 
 
 def main() -> None:
@@ -1,18 +1,24 @@
 #!/usr/bin/env python
 
 import logging
-import logging.config
-from itertools import count
-from typing import TextIO
+from collections import deque
+from itertools import count, islice
+from typing import Final, TextIO
 
-type Deck = list[int]
+from aoc import trace
+
+type Deck = deque[int]
 type Winner = tuple[int, Deck]
 
+# Decks are hashed as polynomials of their cards, modulo 2^64
+MASK: Final = (1 << 64) - 1
+BASE: Final = 0x9E3779B97F4A7C15
+
 
 def parse_data(f: TextIO) -> tuple[Deck, Deck]:
     def parse_deck(lines: str) -> Deck:
         _, *deck = lines.splitlines()
-        return [int(n) for n in deck]
+        return deque(int(n) for n in deck)
 
     deck1, deck2 = [parse_deck(s) for s in f.read().split("\n\n")]
     return deck1, deck2
@@ -26,7 +32,7 @@ def _log_game_results(deck1: Deck, deck2: Deck) -> None:
 
 def normal_game(deck1: Deck, deck2: Deck) -> Winner:
     while deck1 and deck2:
-        c1, c2 = deck1.pop(0), deck2.pop(0)
+        c1, c2 = deck1.popleft(), deck2.popleft()
 
         if c1 > c2:
             deck1.extend([c1, c2])
@@ -38,38 +44,90 @@ def normal_game(deck1: Deck, deck2: Deck) -> Winner:
     return (1, deck1) if deck1 else (2, deck2)
 
 
-_game_counter = 0
+class RecursiveCombat:
+    """Recursive games, with the winners of the sub-games cached.
+
+    The rounds of a game are recorded as the hashes of both decks, which
+    are updated with each card drawn or won, instead of copying the decks.
+    """
+
+    _powers: list[int]
+    _winners: dict[int, int]
+
+    def __init__(self, n_cards: int):
+        self._powers = [1]
+        for _ in range(n_cards):
+            self._powers.append(self._powers[-1] * BASE & MASK)
+        self._winners = {}
+
+    @staticmethod
+    def _hash(deck: Deck) -> int:
+        h = 0
+        for c in deck:
+            h = (h * BASE + c) & MASK
+        return h
+
+    def play(self, deck1: Deck, deck2: Deck) -> int:
+        """Play a game until a player wins all the cards, or a round repeats.
+
+        The decks are modified, with the cards of the winner at the end.
+        """
+        powers = self._powers
+        h1, h2 = self._hash(deck1), self._hash(deck2)
+        base2 = BASE * BASE & MASK
+        draw1, draw2 = deck1.popleft, deck2.popleft
+        prev: set[int] = set()
+        rounds = 0
+
+        while deck1 and deck2:
+            prev.add(h1 << 64 | h2)
+            if len(prev) == rounds:
+                break
+            rounds += 1
+
+            c1, c2 = draw1(), draw2()
+            n1, n2 = len(deck1), len(deck2)
+            h1 = (h1 - c1 * powers[n1]) & MASK
+            h2 = (h2 - c2 * powers[n2]) & MASK
+
+            if c1 <= n1 and c2 <= n2:
+                winner = self._sub_game(deck1, c1, deck2, c2)
+            else:
+                winner = 1 if c1 > c2 else 2
+
+            if winner == 1:
+                deck1 += (c1, c2)
+                h1 = (h1 * base2 + c1 * BASE + c2) & MASK
+            else:
+                deck2 += (c2, c1)
+                h2 = (h2 * base2 + c2 * BASE + c1) & MASK
+
+        trace.count("rounds", rounds)
+        return 1 if deck1 else 2
+
+    def _sub_game(self, deck1: Deck, n1: int, deck2: Deck, n2: int) -> int:
+        sub1 = deque(islice(deck1, n1))
+        sub2 = deque(islice(deck2, n2))
+
+        # The highest card outnumbers the cards in the game, so it never
+        # starts a sub-game and always wins its rounds: its player cannot
+        # lose, and player 1 wins when the rounds repeat.
+        if max(sub1) > max(sub2):
+            return 1
+
+        key = self._hash(sub1) << 64 | self._hash(sub2)
+        if (winner := self._winners.get(key)) is None:
+            trace.count("games")
+            winner = self._winners[key] = self.play(sub1, sub2)
+        return winner
 
 
 def recursive_game(deck1: Deck, deck2: Deck) -> Winner:
-    global _game_counter
-    _game_counter += 1
-    game = _game_counter
-
-    prev = set()
-
-    while deck1 and deck2:
-        key = (tuple(deck1), tuple(deck2))
-        if key in prev:
-            break
-        prev.add(key)
-
-        c1, c2 = deck1.pop(0), deck2.pop(0)
+    winner = RecursiveCombat(len(deck1) + len(deck2)).play(deck1, deck2)
 
-        if c1 <= len(deck1) and c2 <= len(deck2):
-            winner, _ = recursive_game(deck1[:c1], deck2[:c2])
-        else:
-            winner = 1 if c1 > c2 else 2
-
-        if winner == 1:
-            deck1 += [c1, c2]
-        else:
-            deck2 += [c2, c1]
-
-    if game == 1:
-        _log_game_results(deck1, deck2)
+    _log_game_results(deck1, deck2)
 
-    return (1, deck1) if deck1 else (2, deck2)
+    return (1, deck1) if winner == 1 else (2, deck2)
 
 
 def score(deck: Deck) -> int:
@@ -77,17 +135,17 @@ def score(deck: Deck) -> int:
 
 
 def part1(deck1: Deck, deck2: Deck) -> int:
-    _, deck = normal_game(deck1[:], deck2[:])
+    _, deck = normal_game(deck1.copy(), deck2.copy())
     return score(deck)
 
 
 def part2(deck1: Deck, deck2: Deck) -> int:
-    _, deck = recursive_game(deck1[:], deck2[:])
+    _, deck = recursive_game(deck1.copy(), deck2.copy())
     return score(deck)
 
 
 def main() -> None:
-    logging.config.fileConfig("../logging.conf")
+    trace.configure()
 
     d1, d2 = parse_data(open(0))
 
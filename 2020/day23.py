@@ -1,19 +1,18 @@
 #!/usr/bin/env python
 
 import logging
-import logging.config
-from collections.abc import Sequence
+from collections.abc import MutableSequence, Sequence
 from typing import TextIO
 
+from aoc import trace
+from aoc.ring import Ring
+
 
 def parse_data(f: TextIO) -> list[int]:
     return [int(l) for l in f.read().strip()]
 
 
 def _log_cups(linked: Sequence[int], current: int, move: int) -> None:
-    if not logging.getLogger().isEnabledFor(logging.DEBUG):
-        return
-
     cups = [current]
     cup = linked[current]
     while cup != current:
@@ -34,8 +33,6 @@ def _log_move(linked: Sequence[int], current: int, move: int) -> None:
 
 
 def _log_dest(pickups: Sequence[int], dest: int) -> None:
-    if not logging.getLogger().isEnabledFor(logging.DEBUG):
-        return
     logging.debug(f"pick up: {', '.join(str(p) for p in pickups)}")
     logging.debug(f"destination: {dest}\n")
 
@@ -45,44 +42,43 @@ def _log_final(linked: Sequence[int], current: int, move: int) -> None:
     _log_cups(linked, current, move)
 
 
-def arrange(cups: Sequence[int], *, moves: int) -> list[int]:
+def arrange(cups: Sequence[int], *, moves: int) -> MutableSequence[int]:
+    """Play the moves, returning the table of the cup after each cup."""
     n_cups = len(cups)
+    ring = Ring(cups, n_cups + 1, compact=True)
+    debug = trace.enabled(logging.DEBUG)
 
-    # Create linked list (index -> value)
-    linked = [0] * (n_cups + 1)
-    for i in range(n_cups - 1):
-        linked[cups[i]] = cups[i + 1]
-    linked[cups[-1]] = cups[0]
-
+    # Work directly on the table, method calls are too slow for millions of moves
+    linked = ring.succ
     current = cups[0]
-    for i in range(moves):
-        _log_move(linked, current, i)
-
-        # Pickup cups
-        p1 = linked[current]
-        p2 = linked[p1]
-        p3 = linked[p2]
-
-        # Remove pickups
-        linked[current] = linked[p3]
-
-        # Find dest
-        ignored = (current, p1, p2, p3)
-        dest = current
-        while dest in ignored:
-            dest -= 1
-            if dest == 0:
-                dest = n_cups
-        _log_dest((p1, p2, p3), dest)
-
-        # Add pickups after dest
-        linked[p3] = linked[dest]
-        linked[dest] = p1
-
-        # Select next cup
-        current = linked[current]
-
-    _log_final(linked, current, moves)
+    with trace.span("moves"):
+        for i in range(moves):
+            if debug:
+                _log_move(linked, current, i)
+
+            # Pickup cups
+            p1 = linked[current]
+            p2 = linked[p1]
+            p3 = linked[p2]
+
+            # Find dest
+            dest = current - 1 or n_cups
+            while dest in (p1, p2, p3):
+                dest = dest - 1 or n_cups
+            if debug:
+                _log_dest((p1, p2, p3), dest)
+
+            # Move pickups after dest
+            linked[current] = linked[p3]
+            linked[p3] = linked[dest]
+            linked[dest] = p1
+
+            # Select next cup
+            current = linked[current]
+
+    if debug:
+        _log_final(linked, current, moves)
+    trace.count("moves", moves)
     return linked
 
 
@@ -107,7 +103,7 @@ def part2(cups: Sequence[int]) -> int:
 
 
 def main() -> None:
-    logging.config.fileConfig("../logging.conf")
+    trace.configure()
 
     data = parse_data(open(0))
 
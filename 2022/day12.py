@@ -1,42 +1,38 @@
 #!/usr/bin/env python
 
-import heapq
 from collections.abc import Iterator, Sequence
-from typing import TextIO
+from typing import Final, TextIO
+
+from aoc.pathfinding import Cell, Layout, bfs
 
 type Coord = tuple[int, int]
 
 
 class HeightMap:
-    _data: list[list[str]]
+    layout: Final[Layout]
+    _elevations: Final[bytes]
+    _adjacency: Final[list[tuple[Cell, ...]]]
 
     def __init__(self, data: list[list[str]]):
-        self._data = [r[:] for r in data]
+        self.layout = Layout(len(data[0]), len(data))
+        self._elevations = "".join("".join(r) for r in data).encode()
+        self._adjacency = self.layout.adjacency()
 
     @property
     def width(self) -> int:
-        return len(self._data[0])
+        return self.layout.width
 
     @property
     def height(self) -> int:
-        return len(self._data)
-
-    def reachable(self, coord: Coord) -> list[Coord]:
-        x, y = coord
-        adjacent = [(x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)]
-        return [c for c in adjacent if self._in_map(c) and self._can_climb(coord, c)]
-
-    def _in_map(self, coord: Coord) -> bool:
-        return 0 <= coord[0] < self.width and 0 <= coord[1] < self.height
+        return self.layout.height
 
-    def _can_climb(self, coord: Coord, adj: Coord) -> bool:
-        return self._elevation(adj) - self._elevation(coord) <= 1
-
-    def _elevation(self, coord: Coord) -> int:
-        return ord(self._data[coord[1]][coord[0]])
+    def reachable(self, cell: Cell) -> list[Cell]:
+        elevations = self._elevations
+        top = elevations[cell] + 1
+        return [c for c in self._adjacency[cell] if elevations[c] <= top]
 
     def __getitem__(self, coord: Coord) -> str:
-        return self._data[coord[1]][coord[0]]
+        return chr(self._elevations[self.layout.cell(*coord)])
 
 
 def parse_data(f: TextIO) -> tuple[HeightMap, Coord, Coord]:
@@ -60,25 +56,11 @@ def _coords(width: int, height: int) -> Iterator[Coord]:
 
 
 def min_distance(heights: HeightMap, start: Sequence[Coord], target: Coord) -> int:
-    visited = {}
-    queue = [(0, c) for c in start]
-    heapq.heapify(queue)
-
-    while queue:
-        dist, current = heapq.heappop(queue)
-
-        if current == target:
-            visited[current] = dist
-            break
-
-        if current in visited:
-            continue
-        visited[current] = dist
-
-        for coord in heights.reachable(current):
-            heapq.heappush(queue, (dist + 1, coord))
-
-    return visited[target]
+    layout = heights.layout
+    goal = layout.cell(*target)
+    sources = [layout.cell(*c) for c in start]
+    dist = bfs(layout.size, sources, heights.reachable, goals={goal})
+    return dist[goal]
 
 
 def part1(heights: HeightMap, current: Coord, target: Coord) -> int:
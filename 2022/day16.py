@@ -1,15 +1,18 @@
 #!/usr/bin/env python
 
-import itertools
 import re
-import sys
-from collections import deque
-from collections.abc import Iterator, Mapping
+from collections.abc import Mapping
 from dataclasses import dataclass
 from typing import Final, TextIO
 
+import numpy as np
+import numpy.typing as npt
+
 type Name = str
-type Path = list[Name]
+type Distances = npt.NDArray[np.int64]
+type Pressures = npt.NDArray[np.int64]
+
+UNREACHABLE: Final = 1 << 32
 
 
 @dataclass(frozen=True)
@@ -35,116 +38,121 @@ def parse_data(f: TextIO) -> dict[Name, Valve]:
 
 
 class PathFinder:
-    _valves: Final[dict[Name, Valve]]
-    _dist: Final[dict[Name, dict[Name, int]]]
-    _working: Final[set[Name]]
-    _start: Final[Name]
+    """Best pressure released by travelers opening the working valves.
+
+    The working valves are indexed as bits, and the best pressure for each
+    set of opened valves is kept in a table of 2^n entries.
+    """
+
+    _names: Final[list[Name]]
+    _dist: Final[Distances]
+    _rates: Final[list[int]]
+    _time: Final[list[list[int]]]
 
     def __init__(self, valves: Mapping[Name, Valve], start: Name):
-        self._valves = dict(valves)
+        self._names = list(valves)
         self._dist = self._min_dist(valves)
-        self._working = {v for v in self._dist if self._valves[v].rate > 0}
-        self._start = start
+
+        index = {name: i for i, name in enumerate(self._names)}
+        working = [index[v] for v, valve in valves.items() if valve.rate > 0]
+        self._rates = [valves[self._names[v]].rate for v in working]
+        # Time to move from each working valve (and the start) to open another
+        nodes = working + [index[start]]
+        self._time = (self._dist[np.ix_(nodes, working)] + 1).tolist()
 
     @staticmethod
-    def _min_dist(valves: Mapping[Name, Valve]) -> dict[Name, dict[Name, int]]:
+    def _min_dist(valves: Mapping[Name, Valve]) -> Distances:
         # https://en.wikipedia.org/wiki/Floyd%E2%80%93Warshall_algorithm
-        dist = {u: {v: sys.maxsize for v in valves} for u in valves}
-        for u in dist:
-            for v in valves[u].tunnels:
-                dist[u][v] = 1
-        for v in dist:
-            dist[v][v] = 0
-        for k in dist:
-            for i in dist:
-                for j in dist:
-                    dist[i][j] = min(dist[i][j], dist[i][k] + dist[k][j])
+        index = {name: i for i, name in enumerate(valves)}
+        n = len(index)
+        dist = np.full((n, n), UNREACHABLE, dtype=np.int64)
+        for u, valve in valves.items():
+            for v in valve.tunnels:
+                dist[index[u], index[v]] = 1
+        np.fill_diagonal(dist, 0)
+        for k in range(n):
+            np.minimum(dist, dist[:, k, None] + dist[None, k, :], out=dist)
         return dist
 
-    def best_path(self, max_time: int, travelers: int) -> tuple[Path | list[Path], int]:
-        def all_paths(intermediate: bool) -> Iterator[tuple[Path, int]]:
-            return (
-                (path, self._pressure(path, max_time))
-                for path in self._traverse(max_time, intermediate=intermediate)
-            )
-
-        match travelers:
-            case 1:
-                path, pressure = max(all_paths(False), key=lambda t: t[1])
-                return path, pressure
-            case 2:
-                # Simplest solution: generate all possible paths to open valves
-                # (including intermediate paths instead of just "completed"
-                # paths), then find the pair of non-intersecting paths with the
-                # best combined pressure.
-                #
-                # Optimization to reduce the search space: to avoid checking
-                # O(n²) pairs, sort the paths by descending pressure first, and
-                # discard all pairs whose combined pressure could never be
-                # larger than the current max_pressure.
-                best_path, max_pressure = [], 0
-                ordered = sorted(all_paths(True), key=lambda t: t[1], reverse=True)
-                for i, (path1, p1) in enumerate(ordered):
-                    for path2, p2 in itertools.islice(ordered, i + 1):
-                        pressure = p1 + p2
-                        if pressure < max_pressure:
-                            break
-                        if set(path1) & set(path2):
-                            continue
-                        best_path = [path1, path2]
-                        max_pressure = pressure
-                return best_path, max_pressure
-            case _:
-                raise ValueError(f"invalid {travelers=}")
-
-    def _traverse(self, max_time: int, intermediate: bool) -> Iterator[Path]:
-        type State = tuple[int, Name, Path]
-
-        queue: deque[State] = deque()
-        queue.append((0, self._start, []))
-
-        while queue:
-            time, current, visited = queue.popleft()
-            moved = False
-            for closed in self._working - set(visited):
-                open_time = time + self._time(current, closed)
-                if open_time < max_time:
-                    queue.append((open_time, closed, visited + [closed]))
-                    moved = True
-            if intermediate or not moved:
-                yield visited
-
-    def _pressure(self, path: Path, time: int) -> int:
-        current = self._start
-        pressure = 0
-        for node in path:
-            time -= self._time(current, node)
-            pressure += time * self._valves[node].rate
-            current = node
-        return pressure
-
-    def _time(self, u: Name, v: Name) -> int:
-        return self._dist[u][v] + 1
+    def max_pressure(self, max_time: int, travelers: int) -> int:
+        if travelers < 1:
+            raise ValueError(f"invalid {travelers=}")
+
+        best = self._best_by_valves(max_time)
+        if travelers == 1:
+            return int(best.max())
+
+        # Best pressure of the other travelers opening any subset of each set,
+        # combined with the valves opened by the first one
+        combined = self._subset_max(best)
+        for _ in range(travelers - 2):
+            combined = self._combine(best, combined)
+        full = len(best) - 1
+        return int((best + combined[full ^ np.arange(len(best))]).max())
+
+    def _best_by_valves(self, max_time: int) -> Pressures:
+        # Best pressure opening exactly each set of valves. The states at
+        # each remaining time are (position, opened valves), and the last
+        # position is the start
+        n = len(self._rates)
+        best = np.zeros(1 << n, dtype=np.int64)
+
+        layers: list[dict[tuple[int, int], int]] = [{} for _ in range(max_time + 1)]
+        layers[max_time][n, 0] = 0
+        for remaining in range(max_time, 0, -1):
+            for (pos, opened), pressure in layers[remaining].items():
+                if pressure > best[opened]:
+                    best[opened] = pressure
+                for v, t in enumerate(self._time[pos]):
+                    bit = 1 << v
+                    if opened & bit or (left := remaining - t) <= 0:
+                        continue
+                    state = (v, opened | bit)
+                    p = pressure + left * self._rates[v]
+                    if p > layers[left].get(state, -1):
+                        layers[left][state] = p
+        return best
+
+    @staticmethod
+    def _subset_max(best: Pressures) -> Pressures:
+        # The max of the subsets of each set, adding one valve at a time
+        result = best.copy()
+        size = len(result)
+        bit = 1
+        while bit < size:
+            view = result.reshape(-1, 2, bit)
+            np.maximum(view[:, 1, :], view[:, 0, :], out=view[:, 1, :])
+            bit <<= 1
+        return result
+
+    @staticmethod
+    def _combine(best: Pressures, combined: Pressures) -> Pressures:
+        # One more traveler, opening any of the sets with some pressure
+        masks = np.arange(len(best))
+        result = combined.copy()
+        for s in np.flatnonzero(best):
+            within = masks[masks & s == s]
+            result[within] = np.maximum(result[within], best[s] + combined[within ^ s])
+        return result
 
     def __str__(self) -> str:
-        header = "  " + "".join(f"{i:>4s}" for i in self._dist)
+        names = self._names
+        header = "  " + "".join(f"{i:>4s}" for i in names)
         columns = [
-            f"{i:<2s}" + "".join(f"{self._dist[i][j]:>4d}" for j in self._dist)
-            for i in self._dist
+            f"{u:<2s}" + "".join(f"{d:>4d}" for d in row)
+            for u, row in zip(names, self._dist.tolist(), strict=True)
         ]
         return "\n".join([header] + columns)
 
 
 def part1(data: Mapping[Name, Valve]) -> int:
     path_finder = PathFinder(data, "AA")
-    _, pressure = path_finder.best_path(max_time=30, travelers=1)
-    return pressure
+    return path_finder.max_pressure(max_time=30, travelers=1)
 
 
 def part2(data: Mapping[Name, Valve]) -> int:
     path_finder = PathFinder(data, "AA")
-    _, pressure = path_finder.best_path(max_time=26, travelers=2)
-    return pressure
+    return path_finder.max_pressure(max_time=26, travelers=2)
 
 
 def main() -> None:
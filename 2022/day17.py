@@ -1,14 +1,12 @@
 #!/usr/bin/env python
 
-import itertools
-from collections.abc import Iterator, Sequence
+from collections.abc import Sequence
 from dataclasses import dataclass
 from typing import Final, NewType, Self, TextIO
 
-JetPattern = NewType("JetPattern", str)
-
-type Enumeration[T] = Iterator[tuple[int, T]]
+from aoc.cycles import extrapolate
 
+JetPattern = NewType("JetPattern", str)
 
 ROCK: Final = "#"
 EMPTY: Final = "."
@@ -44,151 +42,130 @@ def parse_data(f: TextIO) -> JetPattern:
     return JetPattern(f.read().strip())
 
 
-@dataclass(frozen=True)
-class Coord:
-    x: int
-    y: int
-
-
 @dataclass(frozen=True)
 class Rock:
-    data: Sequence[Sequence[str]]
+    # Bit masks of the rows from the bottom, at the starting position.
+    # The left wall is the highest bit.
+    rows: tuple[int, ...]
 
     @classmethod
     def make(cls, data: Sequence[str]) -> Self:
-        return cls([list(line) for line in data])
-
-    @property
-    def width(self) -> int:
-        return len(self.data[0])
+        shift = Tunnel.WIDTH - Tunnel.LEFT - len(data[0])
+        return cls(tuple(_mask(line) << shift for line in reversed(data)))
 
     @property
     def height(self) -> int:
-        return len(self.data)
+        return len(self.rows)
+
+
+def _mask(line: str) -> int:
+    return int(line.replace(ROCK, "1").replace(EMPTY, "0"), 2)
 
 
 class Tunnel:
-    _data: Final[list[list[str]]]
-    _jets: Final[Enumeration[str]]
-    _rocks: Final[Enumeration[Rock]]
+    _rows: Final[list[int]]
+    _jets: Final[JetPattern]
+    _rocks: Final[Sequence[Rock]]
+    _top: int
+    _next_jet: int
+    _next_rock: int
 
     WIDTH: Final = 7
+    LEFT: Final = 2
     DELTA: Final = 3
 
+    LEFT_WALL: Final = 1 << (WIDTH - 1)
+    RIGHT_WALL: Final = 1
+    FULL: Final = (1 << WIDTH) - 1
+
     def __init__(self, jets: JetPattern):
-        self._data = []
-        self._jets = itertools.cycle(enumerate(jets))
-        self._rocks = itertools.cycle(enumerate([Rock.make(r) for r in ROCKS]))
+        self._rows = []
+        self._jets = jets
+        self._rocks = [Rock.make(r) for r in ROCKS]
+        self._top = -1
+        self._next_jet = 0
+        self._next_rock = 0
 
     def falling_rocks(self, n: int) -> int:
-        state: dict[tuple[int, ...], int] = {}
-        cache: dict[int, int] = {}
-
-        top = -1
-        for k in range(1, n + 1):
-            # add rock
-            top, i, j = self._add_rock(top)
-
-            # detect cycle
-            key = (i, j, *self._state_at_top(top))
-            if key in state:
-                prev = state[key]
-                top = self._calculate_top(top, (k, prev, n), cache)
-                break
-            state[key] = k
-            cache[k] = top
+        return extrapolate(
+            self,
+            Tunnel._add_rock,
+            n,
+            key=Tunnel._state,
+            value=lambda t: t.height,
+        )
 
-        return top + 1
+    @property
+    def height(self) -> int:
+        return self._top + 1
+
+    def _add_rock(self) -> Self:
+        rock = self._rocks[self._next_rock]
+        self._next_rock = (self._next_rock + 1) % len(self._rocks)
 
-    def _add_rock(self, top: int) -> tuple[int, int, int]:
-        i, rock = next(self._rocks)
-        current = self._orig(top, rock)
-        self._expand(current)
+        masks = rock.rows
+        y = self._top + Tunnel.DELTA + 1
+        self._expand(y + rock.height)
         while True:
             # Effect of jet
-            j, jet = next(self._jets)
-            new = self._push(current, jet)
-            if self._can_move_to(new, rock):
-                current = new
+            jet = self._jets[self._next_jet]
+            self._next_jet = (self._next_jet + 1) % len(self._jets)
+            new = self._push(masks, jet)
+            if new is not None and not self._overlap(new, y):
+                masks = new
             # Fall down
-            new = self._fall(current)
-            if not self._can_move_to(new, rock):
-                self._rest(current, rock)
+            if y == 0 or self._overlap(masks, y - 1):
+                self._rest(masks, y)
                 break
-            current = new
-        top = max(top, current.y)
-        return top, i, j
-
-    def _orig(self, top: int, r: Rock) -> Coord:
-        x, y = 2, top + Tunnel.DELTA + r.height
-        return Coord(x, y)
-
-    def _expand(self, orig: Coord) -> None:
-        delta = orig.y - (len(self._data) - 1)
-        if delta > 0:
-            self._data.extend(["."] * Tunnel.WIDTH for _ in range(delta))
-
-    def _can_move_to(self, c: Coord, r: Rock) -> bool:
-        return self._inside_walls(c, r) and not (
-            self._overlap(c, r) or self._at_bottom(c, r)
-        )
-
-    def _overlap(self, c: Coord, r: Rock) -> bool:
-        for i in range(r.height):
-            for j in range(r.width):
-                if r.data[i][j] == ROCK and self._data[c.y - i][c.x + j] == ROCK:
-                    return True
-        return False
-
-    def _rest(self, c: Coord, r: Rock) -> None:
-        for i in range(r.height):
-            for j in range(r.width):
-                if r.data[i][j] == ROCK:
-                    self._data[c.y - i][c.x + j] = ROCK
-
-    def _state_at_top(self, top: int) -> tuple[int, ...]:
-        def delta(j: int) -> int:
-            it = (i for i in reversed(range(top + 1)) if self._data[i][j] == ROCK)
-            i = next(it, 0)
-            return top - i
-
-        return tuple(delta(j) for j in range(Tunnel.WIDTH))
-
-    def _calculate_top(
-        self, top: int, cycle_info: tuple[int, int, int], cache: dict[int, int]
-    ) -> int:
-        current, prev, total = cycle_info
-        period = current - prev
-        cycles = (total - prev) // period
-        rest = (total - prev) % period
-        delta_top = top - cache[prev]
-        return cache[prev] + cycles * delta_top + (cache[prev + rest] - cache[prev])
+            y -= 1
+        self._top = max(self._top, y + rock.height - 1)
+        return self
+
+    def _state(self) -> tuple[int, ...]:
+        return (self._next_rock, self._next_jet, *self._surface())
+
+    def _expand(self, height: int) -> None:
+        if (delta := height - len(self._rows)) > 0:
+            self._rows.extend([0] * delta)
+
+    def _overlap(self, masks: Sequence[int], y: int) -> bool:
+        rows = self._rows
+        return any(rows[y + i] & m for i, m in enumerate(masks))
+
+    def _rest(self, masks: Sequence[int], y: int) -> None:
+        for i, m in enumerate(masks):
+            self._rows[y + i] |= m
+
+    def _surface(self) -> Sequence[int]:
+        # The rows from the top down to the highest rock of every column
+        seen = 0
+        bottom = self._top + 1
+        while bottom > 0 and seen != Tunnel.FULL:
+            bottom -= 1
+            seen |= self._rows[bottom]
+        return self._rows[bottom : self._top + 1]
 
     @staticmethod
-    def _push(c: Coord, j: str) -> Coord:
-        match j:
+    def _push(masks: tuple[int, ...], jet: str) -> tuple[int, ...] | None:
+        match jet:
             case "<":
-                return Coord(c.x - 1, c.y)
+                if any(m & Tunnel.LEFT_WALL for m in masks):
+                    return None
+                return tuple(m << 1 for m in masks)
             case ">":
-                return Coord(c.x + 1, c.y)
+                if any(m & Tunnel.RIGHT_WALL for m in masks):
+                    return None
+                return tuple(m >> 1 for m in masks)
             case _:
-                raise ValueError("invalid jet: {_}")
-
-    @staticmethod
-    def _fall(c: Coord) -> Coord:
-        return Coord(c.x, c.y - 1)
-
-    @staticmethod
-    def _inside_walls(c: Coord, r: Rock) -> bool:
-        return c.x >= 0 and c.x + r.width - 1 < Tunnel.WIDTH
-
-    @staticmethod
-    def _at_bottom(c: Coord, r: Rock) -> bool:
-        return c.y - (r.height - 1) < 0
+                raise ValueError(f"invalid jet: {jet}")
 
     def __str__(self) -> str:
-        rows = ["|" + "".join(row) + "|" for row in reversed(self._data)]
-        bottom = "+" + "-" * 7 + "+"
+        def row(mask: int) -> str:
+            bits = f"{mask:0{Tunnel.WIDTH}b}"
+            return bits.replace("1", ROCK).replace("0", EMPTY)
+
+        rows = ["|" + row(mask) + "|" for mask in reversed(self._rows)]
+        bottom = "+" + "-" * Tunnel.WIDTH + "+"
         return "\n".join(rows + [bottom])
 
 
@@ -3,6 +3,8 @@
 from collections.abc import Sequence
 from typing import TextIO
 
+from aoc.blocklist import BlockList
+
 type Coord = tuple[int, int, int]
 
 
@@ -13,12 +15,11 @@ def parse_data(f: TextIO) -> list[int]:
 def decrypt(encrypted: Sequence[int], key: int, iterations: int) -> Coord:
     # Use indices to ensure unique positions, because of duplicated numbers
     numbers = [key * n for n in encrypted]
-    indices = list(range(len(numbers)))
+    indices = BlockList(range(len(numbers)))
 
     # Mix
-    initial = indices[:]
     for _ in range(iterations):
-        for i in initial:
+        for i in range(len(numbers)):
             current = indices.index(i)
             target = (current + numbers[i]) % (len(indices) - 1)
             indices.pop(current)
@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 
-from collections.abc import Callable, Mapping
-from dataclasses import dataclass, replace
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from fractions import Fraction
 from types import MappingProxyType
 from typing import Final, TextIO
 
@@ -15,6 +16,7 @@ class Operation:
 
 type Operator = Callable[[int, int], int]
 type Action = int | Operation
+type Inverse = Callable[[Fraction, int], Fraction]
 
 
 operators: Final = MappingProxyType(
@@ -41,6 +43,27 @@ def parse_data(f: TextIO) -> dict[str, Action]:
     return dict(parse_monkey(l) for l in f)
 
 
+# Solve `x op b = t` (left) and `a op x = t` (right) for x, given t and the
+# other operand. Exact when the divisions of the tree are exact.
+left_inverses: Final[Mapping[str, Inverse]] = MappingProxyType(
+    {
+        "+": lambda t, b: t - b,
+        "-": lambda t, b: t + b,
+        "*": lambda t, b: t / b,
+        "/": lambda t, b: t * b,
+    }
+)
+
+right_inverses: Final[Mapping[str, Inverse]] = MappingProxyType(
+    {
+        "+": lambda t, a: t - a,
+        "-": lambda t, a: a - t,
+        "*": lambda t, a: t / a,
+        "/": lambda t, a: a / t,
+    }
+)
+
+
 class Evaluator:
     _tree: Final[Mapping[str, Action]]
     _operators: Final[Mapping[str, Operator]]
@@ -49,7 +72,14 @@ class Evaluator:
         self._tree = tree
         self._operators = operators
 
-    def eval(self, node: str = "root") -> int:
+    def eval(self, node: str = "root", *, iterative: bool = False) -> int:
+        """The value of the node.
+
+        The iterative mode does not recurse, for trees deeper than the
+        recursion limit.
+        """
+        if iterative:
+            return self._fold(node, None)[node]
         match self._tree[node]:
             case int(x):
                 return x
@@ -58,77 +88,79 @@ class Evaluator:
             case other:
                 raise ValueError(f"invalid action: {other}")
 
+    def _postorder(self, node: str) -> Iterator[tuple[str, Action]]:
+        # The nodes of the subtree, each one after its operands
+        seen = set()
+        stack = [(node, False)]
+        while stack:
+            name, expanded = stack.pop()
+            if expanded:
+                yield name, self._tree[name]
+            elif name not in seen:
+                seen.add(name)
+                stack.append((name, True))
+                if isinstance(action := self._tree[name], Operation):
+                    stack += [(action.rhs, False), (action.lhs, False)]
+
+    def _fold(self, node: str, unknown: str | None) -> dict[str, int]:
+        # The values of the nodes of the subtree that do not depend on unknown
+        values: dict[str, int] = {}
+        for name, action in self._postorder(node):
+            match action:
+                case _ if name == unknown:
+                    pass
+                case int(x):
+                    values[name] = x
+                case Operation(lhs, rhs, op):
+                    if lhs in values and rhs in values:
+                        values[name] = self._operators[op](values[lhs], values[rhs])
+                case other:
+                    raise ValueError(f"invalid action: {other}")
+        return values
+
+    def solve(self, unknown: str, node: str = "root") -> Fraction:
+        """The value of `unknown` that makes both operands of the node equal.
+
+        The subtrees without `unknown` are folded into their values once,
+        and the operations on the path to `unknown` are inverted one by one.
+        """
+        known = self._fold(node, unknown)
+        if node in known:
+            raise ValueError(f"{node} does not depend on {unknown}")
+
+        target: Fraction
+        match self._tree[node]:
+            case Operation(lhs, rhs) if rhs in known:
+                target, current = Fraction(known[rhs]), lhs
+            case Operation(lhs, rhs) if lhs in known:
+                target, current = Fraction(known[lhs]), rhs
+            case _:
+                raise ValueError(f"cannot solve {node} for {unknown}")
+
+        while current != unknown:
+            match self._tree[current]:
+                case Operation(lhs, rhs, op) if rhs in known:
+                    target, current = left_inverses[op](target, known[rhs]), lhs
+                case Operation(lhs, rhs, op) if lhs in known:
+                    target, current = right_inverses[op](target, known[lhs]), rhs
+                case _:
+                    raise ValueError(f"cannot solve {current} for {unknown}")
+
+        return target
+
 
 def part1(data: Mapping[str, Action]) -> int:
     evaluator = Evaluator(data, operators)
-    return evaluator.eval()
+    return evaluator.eval(iterative=True)
 
 
 def part2(data: Mapping[str, Action]) -> int:
-    # Use cmp() function as the new "root" operator.
-    # The root eval of numbers near the wanted number X will be either:
-    #
-    #  X-3       X       X+3
-    #   1  1  1  0 -1 -1 -1
-    #
-    # or:
-    #
-    #  X-3       X       X+3
-    #  -1 -1 -1  0  1  1  1
-    #
-    # This will allow to use binary searh to find the wanted number.
-
-    def cmp(a: int, b: int) -> int:
-        return (a > b) - (a < b)
-
-    def eval(x: int) -> int:
-        tree["humn"] = x
-        return evaluator.eval()
-
-    root = data["root"]
-    assert isinstance(root, Operation)
-
-    tree = dict(data) | {"root": replace(root, op="=")}
-    evaluator = Evaluator(tree, operators | {"=": cmp})
-
-    # Find search boundaries.
-    target = 1
-    result = eval(target)
-    lower = result
-
-    # Eval until the cmp() result changes
-    while result == lower:
-        target *= 10
-        result = eval(target)
-    low = target // 10
-    high = target
-    upper = result
-
-    # Find target value using binary search.
-    #
-    # Example: T is left of X, so (R := eval(T)) == L.
-    # For next iteration: l = T
-    #
-    #   l              T     X        h
-    #   1  1  1  1  1  1  1  0 -1 -1 -1
-    #     L=1          R         U=-1
-    #
-    # Example: T is right of X, so (R := eval(T)) == U.
-    # For next iteration: h = T
-    #
-    #   l        X     T              h
-    #   1  1  1  0 -1 -1 -1 -1 -1 -1 -1
-    #     L=1          R         U=-1
-    #
-    while result != 0:
-        target = (high + low) // 2
-        result = eval(target)
-        if result == lower:
-            low = target
-        elif result == upper:
-            high = target
-
-    return target
+    # The root operation becomes an equality, solved for the human number
+    evaluator = Evaluator(data, operators)
+    x = evaluator.solve("humn")
+    if x.denominator != 1:
+        raise ValueError(f"no integer solution: {x}")
+    return int(x)
 
 
 def main() -> None:
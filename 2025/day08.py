@@ -1,12 +1,25 @@
 #!/usr/bin/env python
 
+import heapq
 import math
 from collections.abc import Iterator, Sequence
-from itertools import combinations, islice
-from typing import TextIO
+from itertools import islice, product
+from typing import Final, TextIO
+
+import numpy as np
+import numpy.typing as npt
+
+from aoc.unionfind import UnionFind
 
 type Coord = tuple[int, int, int]
-type Circuit = frozenset[int]
+type Indices = npt.NDArray[np.intp]
+type Points = npt.NDArray[np.int64]
+
+# Expected number of pairs per box found with the first radius
+PAIRS_PER_BOX: Final = 4
+
+# Offsets to the neighbour cells after a cell, each pair of cells is visited once
+_FORWARD: Final = [d for d in product((-1, 0, 1), repeat=3) if d > (0, 0, 0)]
 
 
 def parse_data(f: TextIO) -> list[Coord]:
@@ -17,40 +30,90 @@ def parse_data(f: TextIO) -> list[Coord]:
     return [parse(ln) for ln in f]
 
 
-def connect(boxes: Sequence[Coord]) -> Iterator[tuple[int, int, set[Circuit]]]:
-    idx = range(len(boxes))
-
-    # get pair of boxes sorted by distance
-    pairs = list(combinations(idx, 2))
-    pairs = sorted(pairs, key=lambda p: math.dist(boxes[p[0]], boxes[p[1]]))
-
-    # initial circuits of single box
-    circuits = {frozenset([i]) for i in idx}
-
-    for i1, i2 in pairs:
-        c1 = next(c for c in circuits if i1 in c)
-        c2 = next(c for c in circuits if i2 in c)
-
-        if c1 != c2:
-            circuits -= {c1, c2}
-            circuits |= {c1 | c2}
-
-        yield (i1, i2, circuits)
+def _ranges(starts: Indices, stops: Indices) -> tuple[Indices, Indices]:
+    # The pairs (k, x) for each x in range(starts[k], stops[k])
+    counts = np.maximum(stops - starts, 0)
+    k = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(k)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return k, starts[k] + offsets
+
+
+def close_pairs(
+    points: Points, radius: int
+) -> tuple[Indices, Indices, npt.NDArray[np.int64]]:
+    """The pairs (i < j) of points with distance at most `radius`, with the
+    squared distances.
+
+    The points are grouped in cubic cells of the radius size, so only the
+    points in neighbour cells are compared.
+    """
+    cells = points // radius
+    cells -= cells.min(axis=0) - 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    n = len(keys)
+
+    # Pairs inside the same cell, and with the points of the forward cells
+    k, x = _ranges(np.arange(1, n + 1), np.searchsorted(keys, keys, "right"))
+    first, second = [k], [x]
+    for dx, dy, dz in _FORWARD:
+        delta = (dx * dims[1] + dy) * dims[2] + dz
+        starts = np.searchsorted(keys, keys + delta, "left")
+        stops = np.searchsorted(keys, keys + delta, "right")
+        k, x = _ranges(starts, stops)
+        first.append(k)
+        second.append(x)
+
+    a = order[np.concatenate(first)]
+    b = order[np.concatenate(second)]
+    i, j = np.minimum(a, b), np.maximum(a, b)
+    dist2 = ((points[i] - points[j]) ** 2).sum(axis=1)
+    close = dist2 <= radius * radius
+    return i[close], j[close], dist2[close]
+
+
+def closest_pairs(boxes: Sequence[Coord]) -> Iterator[tuple[int, int]]:
+    """All the pairs of boxes (i < j), sorted by distance (and index).
+
+    The pairs are found within a radius, doubled each time all the pairs
+    within the previous radius are used.
+    """
+    points = np.array(boxes, dtype=np.int64).reshape(-1, 3)
+    if len(points) < 2:
+        return
+
+    extent = points.max(axis=0) - points.min(axis=0) + 1
+    volume = math.prod(int(e) for e in extent)
+    radius = max(1, round((3 * PAIRS_PER_BOX * volume / len(points)) ** (1 / 3)))
+    diagonal2 = int((extent**2).sum())
+
+    prev2 = -1
+    while prev2 < diagonal2:
+        i, j, dist2 = close_pairs(points, radius)
+        new = dist2 > prev2
+        i, j, dist2 = i[new], j[new], dist2[new]
+        order = np.lexsort((j, i, dist2))
+        yield from zip(i[order].tolist(), j[order].tolist(), strict=True)
+        prev2 = radius * radius
+        radius *= 2
 
 
 def part1(boxes: Sequence[Coord], limit: int) -> int:
-    circuits = set[Circuit]()
-    for _, _, circuits in islice(connect(boxes), limit):  # noqa: B007
-        pass
-    top = sorted(circuits, key=lambda c: len(c))[-3:]
-    return math.prod(map(len, top))
+    circuits = UnionFind(len(boxes))
+    for i, j in islice(closest_pairs(boxes), limit):
+        circuits.union(i, j)
+    return math.prod(heapq.nlargest(3, circuits.sizes()))
 
 
 def part2(boxes: Sequence[Coord]) -> int:
-    circuits = set[Circuit]()
-    for b1, b2, circuits in connect(boxes):
-        if len(circuits) == 1:
-            return boxes[b1][0] * boxes[b2][0]
+    # Kruskal, until a single circuit remains
+    circuits = UnionFind(len(boxes))
+    for i, j in closest_pairs(boxes):
+        if circuits.union(i, j) and circuits.count == 1:
+            return boxes[i][0] * boxes[j][0]
     raise AssertionError
 
 
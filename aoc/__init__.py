@@ -0,0 +1 @@
+"""Shared runtime for the Advent of Code solutions."""
@@ -0,0 +1,218 @@
+import argparse
+import csv
+import json
+import sys
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+
+from aoc import bench, trace
+from aoc.pool import run_parallel
+from aoc.runner import Day, DayResult, find_days, run_days, years
+
+FIELDS = ("year", "day", "phase", "status", "seconds", "answer")
+BENCH_FIELDS = (
+    "case",
+    "runs",
+    "min",
+    "median",
+    "p95",
+    "max_rss_kb",
+    "baseline",
+    "change",
+)
+
+
+def _write_tsv(results: Iterable[DayResult]) -> None:
+    writer: csv.DictWriter[str] = csv.DictWriter(
+        sys.stdout, FIELDS, delimiter="\t", lineterminator="\n", restval=""
+    )
+    writer.writeheader()
+    for result in results:
+        for row in result.rows():
+            if row["seconds"] is not None:
+                row["seconds"] = f"{row['seconds']:.6f}"
+            writer.writerow(row)
+        sys.stdout.flush()
+
+
+def _write_json(results: Iterable[DayResult]) -> None:
+    rows = [row for result in results for row in result.rows()]
+    json.dump(rows, sys.stdout, indent=2)
+    print()
+
+
+def _write_metrics(path: Path, results: Iterable[DayResult]) -> None:
+    metrics = [{"day": r.day.name, "times": r.times, **r.metrics} for r in results]
+    with open(path, "w") as f:
+        json.dump(metrics, f, indent=2)
+        f.write("\n")
+
+
+def _add_days_arguments(parser: argparse.ArgumentParser, *, required: bool) -> None:
+    parser.add_argument("years", nargs="*", type=int, help="years (default: all)")
+    days = parser.add_mutually_exclusive_group(required=required)
+    days.add_argument("-a", "--all", action="store_true", help="all days")
+    days.add_argument("-d", "--day", dest="days", type=int, action="append", help="day")
+
+
+def _selected_days(args: argparse.Namespace) -> list[Day]:
+    if not (args.all or args.days):
+        return []
+    return [d for y in args.years or years() for d in find_days(y, args.days or ())]
+
+
+def _parse_args(argv: Sequence[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m aoc")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run solutions with the user input data")
+    _add_days_arguments(run, required=True)
+    run.add_argument("-f", "--format", choices=("tsv", "json"), default="tsv")
+    run.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="days run in parallel processes (0: one per CPU)",
+    )
+    run.add_argument("--timeout", type=float, help="seconds allowed for each day")
+    run.add_argument(
+        "--history",
+        type=Path,
+        default=bench.DEFAULT_HISTORY,
+        help="benchmark history used to start the slowest days first",
+    )
+    run.add_argument(
+        "--trace",
+        choices=("debug", "info"),
+        help="write the trace output of the solutions to stderr (needs --jobs 1)",
+    )
+    run.add_argument(
+        "--metrics",
+        type=Path,
+        help="write the counters and times recorded by the solutions as JSON",
+    )
+
+    bench_ = commands.add_parser("bench", help="benchmark solutions")
+    _add_days_arguments(bench_, required=False)
+    bench_.add_argument(
+        "-c", "--case", dest="cases", action="append", default=[], help="named case"
+    )
+    bench_.add_argument(
+        "--heavy", action="store_true", help="include the tracked heavy cases"
+    )
+    bench_.add_argument("-n", "--repeat", type=int, default=5, help="runs per case")
+    bench_.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=bench.DEFAULT_THRESHOLD,
+        help="median slowdown reported as regression (default: %(default)s)",
+    )
+    bench_.add_argument("--history", type=Path, default=bench.DEFAULT_HISTORY)
+    bench_.add_argument(
+        "--no-save", dest="save", action="store_false", help="do not update history"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.trace and (args.jobs != 1 or args.timeout):
+        parser.error("run: --trace needs --jobs 1 and no --timeout")
+    if args.command == "bench" and not (
+        args.all or args.days or args.cases or args.heavy
+    ):
+        parser.error("bench: nothing to benchmark")
+    return args
+
+
+def _run(args: argparse.Namespace) -> int:
+    failed = []
+    done = []
+
+    def check(results: Iterable[DayResult]) -> Iterator[DayResult]:
+        for result in results:
+            if result.status in ("error", "timeout"):
+                failed.append(result.day)
+            done.append(result)
+            yield result
+
+    if args.trace:
+        trace.configure(args.trace, sys.stderr)
+
+    days = _selected_days(args)
+    metrics = args.metrics is not None
+    if args.jobs == 1 and args.timeout is None:
+        results = run_days(days, metrics=metrics)
+    else:
+        expected = bench.expected_times(bench.load_history(args.history))
+        results = run_parallel(
+            days,
+            jobs=args.jobs,
+            timeout=args.timeout,
+            expected=expected,
+            metrics=metrics,
+        )
+
+    results = check(results)
+    if args.format == "json":
+        _write_json(results)
+    else:
+        _write_tsv(results)
+
+    if args.metrics is not None:
+        _write_metrics(args.metrics, done)
+
+    return 1 if failed else 0
+
+
+def _bench(args: argparse.Namespace) -> int:
+    cases = list(args.cases)
+    if args.heavy:
+        cases += bench.heavy_cases()
+    cases += bench.day_cases(_selected_days(args))
+
+    runs = bench.load_history(args.history)
+    results = {}
+
+    writer: csv.DictWriter[str] = csv.DictWriter(
+        sys.stdout, BENCH_FIELDS, delimiter="\t", lineterminator="\n", restval=""
+    )
+    writer.writeheader()
+    for case, stats in bench.measure(cases, args.repeat):
+        results[case] = stats
+        row: dict[str, str | int] = {
+            "case": case,
+            "runs": stats.runs,
+            "max_rss_kb": stats.max_rss_kb,
+        }
+        row |= {k: f"{getattr(stats, k):.6f}" for k in ("min", "median", "p95")}
+        if (base := bench.baseline(runs, case)) is not None:
+            row["baseline"] = f"{base.median:.6f}"
+            row["change"] = f"{stats.median / base.median - 1:+.1%}"
+        writer.writerow(row)
+        sys.stdout.flush()
+
+    found = bench.regressions(runs, results, args.threshold)
+    for r in found:
+        print(
+            f"regression: {r.name} {r.baseline:.6f}s -> {r.current:.6f}s ({r.change:+.1%})",
+            file=sys.stderr,
+        )
+
+    if args.save:
+        bench.save_history(args.history, [*runs, bench.new_run(results)])
+
+    return 1 if found else 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _parse_args(argv)
+    match args.command:
+        case "run":
+            return _run(args)
+        case "bench":
+            return _bench(args)
+    raise AssertionError
+
+
+if __name__ == "__main__":
+    sys.exit(main())
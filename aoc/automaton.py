@@ -0,0 +1,90 @@
+from collections.abc import Sequence
+from typing import Final
+
+import numpy as np
+import numpy.typing as npt
+
+# Cells are stored as the byte value of their character
+type Grid = npt.NDArray[np.uint8]
+type Mask = npt.NDArray[np.bool_]
+type Counts = npt.NDArray[np.int64]
+
+DIRECTIONS: Final = (
+    (-1, -1),
+    (-1, 0),
+    (-1, 1),
+    (0, -1),
+    (0, 1),
+    (1, -1),
+    (1, 0),
+    (1, 1),
+)
+
+
+def parse_grid(data: Sequence[str]) -> Grid:
+    rows = [l.rstrip("\n").encode() for l in data if l.strip()]
+    return np.array([list(r) for r in rows], dtype=np.uint8)
+
+
+def render(grid: Grid) -> str:
+    return "".join(r.tobytes().decode() + "\n" for r in grid)
+
+
+def cell(c: str) -> np.uint8:
+    return np.uint8(ord(c))
+
+
+def adjacent_counts(mask: Mask) -> Counts:
+    """Number of the 8 adjacent cells in the mask, for each cell."""
+    rows, cols = mask.shape
+    padded = np.pad(mask, 1).astype(np.int64)
+    counts = np.zeros((rows, cols), dtype=np.int64)
+    for di, dj in DIRECTIONS:
+        counts += padded[1 + di : 1 + di + rows, 1 + dj : 1 + dj + cols]
+    return counts
+
+
+class LineOfSight:
+    """Count the first cell of a mask seen in each of the 8 directions.
+
+    The neighbour index stores, for each direction and cell, the flat index
+    of the first visible cell, or the index of an extra cell always unset.
+    """
+
+    _index: npt.NDArray[np.intp]
+
+    def __init__(self, visible: Mask):
+        rows, cols = visible.shape
+        size = rows * cols
+        ids = np.arange(size).reshape(rows, cols)
+
+        index = np.full((len(DIRECTIONS), rows, cols), size, dtype=np.intp)
+        for k, (di, dj) in enumerate(DIRECTIONS):
+            nearest = index[k]
+            # Sweep lines from the side the direction points to,
+            # so the nearest cell of the next line is already known
+            if di != 0:
+                order = range(rows - 1, -1, -1) if di > 0 else range(rows)
+                for i in order:
+                    if not 0 <= i + di < rows:
+                        continue
+                    src = slice(max(dj, 0), cols + min(dj, 0))
+                    dst = slice(max(-dj, 0), cols + min(-dj, 0))
+                    nxt = visible[i + di, src]
+                    nearest[i, dst] = np.where(
+                        nxt, ids[i + di, src], nearest[i + di, src]
+                    )
+            else:
+                order = range(cols - 1, -1, -1) if dj > 0 else range(cols)
+                for j in order:
+                    if not 0 <= j + dj < cols:
+                        continue
+                    nxt = visible[:, j + dj]
+                    nearest[:, j] = np.where(nxt, ids[:, j + dj], nearest[:, j + dj])
+
+        self._index = index.reshape(len(DIRECTIONS), size)
+
+    def counts(self, mask: Mask) -> Counts:
+        flat = np.append(mask.ravel(), False).astype(np.int64)
+        counts: Counts = flat[self._index].sum(axis=0)
+        return counts.reshape(mask.shape)
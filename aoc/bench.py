@@ -0,0 +1,229 @@
+import json
+import math
+import multiprocessing
+import platform
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from concurrent import futures
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from types import ModuleType
+from typing import Any, Final, Self
+
+from aoc.runner import (
+    ROOT,
+    Day,
+    call_main,
+    call_part,
+    find_days,
+    load_module,
+    parse_input,
+    part_calls,
+)
+
+HISTORY_VERSION: Final = 1
+DEFAULT_HISTORY: Final = ROOT / "bench.json"
+DEFAULT_THRESHOLD: Final = 0.10
+
+type Setup = Callable[[ModuleType], Callable[[], object]]
+
+
+@dataclass(frozen=True)
+class Stats:
+    runs: int
+    min: float
+    median: float
+    p95: float
+    max_rss_kb: int
+
+    @classmethod
+    def from_times(cls, times: Sequence[float], max_rss_kb: int) -> Self:
+        ordered = sorted(times)
+        # nearest-rank percentile
+        p95 = ordered[math.ceil(0.95 * len(ordered)) - 1]
+        return cls(len(times), ordered[0], statistics.median(ordered), p95, max_rss_kb)
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1
+
+
+def _mixing_input(n: int) -> list[int]:
+    # Random numbers to mix, the coordinates are found from a zero
+    rng = random.Random(n)
+    return [rng.randint(-10_000, 10_000) for _ in range(n - 1)] + [0]
+
+
+# Heavy solutions tracked with fixed arguments, they do not need input data
+_HEAVY: Final[Mapping[str, Setup]] = {
+    "2020/day23.arrange": lambda m: partial(
+        m.arrange, [3, 8, 9, 1, 2, 5, 4, 6, 7, *range(10, 1_000_001)], moves=10_000_000
+    ),
+    "2018/day09.marble_mania": lambda m: partial(m.marble_mania, 463, 7_178_700),
+    "2018/day11.max_power_dial": lambda m: partial(m.max_power_dial, m.make_grid(18)),
+    "2022/day20.decrypt_50k": lambda m: partial(
+        m.decrypt, _mixing_input(50_000), key=1, iterations=1
+    ),
+    "2022/day20.decrypt_500k": lambda m: partial(
+        m.decrypt, _mixing_input(500_000), key=1, iterations=1
+    ),
+}
+
+_CASE_RE: Final = re.compile(r"(\d{4})/day(\d\d)\.(\w+)")
+
+
+def heavy_cases() -> list[str]:
+    return list(_HEAVY)
+
+
+def day_cases(days: Sequence[Day]) -> Iterator[str]:
+    """Benchmark cases for each part of the days with input data.
+
+    Days that cannot be run per part (see `part_calls`) have a single case
+    for their whole main() instead.
+    """
+    for day in days:
+        if not day.input_path.is_file():
+            continue
+        if (calls := part_calls(load_module(day))) is not None:
+            yield from (f"{day.name}.{part}" for part in calls)
+        else:
+            yield f"{day.name}.main"
+
+
+def _setup(case: str) -> Callable[[], object]:
+    m = _CASE_RE.fullmatch(case)
+    if m is None:
+        raise ValueError(f"invalid benchmark case: {case}")
+    (day,) = find_days(int(m[1]), [int(m[2])])
+    module = load_module(day)
+
+    if case in _HEAVY:
+        return _HEAVY[case](module)
+
+    calls = part_calls(module)
+    if calls is None and m[3] == "main":
+        return partial(call_main, module, day.input_path)
+    if calls is None or m[3] not in calls:
+        raise ValueError(f"not a part run from main(): {case}")
+    fn, unpack = getattr(module, m[3]), calls[m[3]]
+    # Parse again for every run, solutions may modify their input data
+    return lambda: call_part(fn, parse_input(module, day.input_path), unpack)
+
+
+def _max_rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _measure(case: str, repeat: int) -> Stats:
+    run = _setup(case)
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        times.append(perf_counter() - start)
+    return Stats.from_times(times, _max_rss_kb())
+
+
+def measure(cases: Sequence[str], repeat: int) -> Iterator[tuple[str, Stats]]:
+    """Run each case in a fresh process, so its peak RSS is not shared."""
+    context = multiprocessing.get_context("spawn")
+    with futures.ProcessPoolExecutor(1, context, max_tasks_per_child=1) as executor:
+        for case in cases:
+            yield case, executor.submit(_measure, case, repeat).result()
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def load_history(path: Path) -> list[dict[str, Any]]:
+    if not path.is_file():
+        return []
+    with open(path) as f:
+        history = json.load(f)
+    if history.get("version") != HISTORY_VERSION:
+        raise ValueError(f"unsupported benchmark history version in {path}")
+    runs: list[dict[str, Any]] = history["runs"]
+    return runs
+
+
+def save_history(path: Path, runs: Sequence[Mapping[str, Any]]) -> None:
+    with open(path, "w") as f:
+        json.dump({"version": HISTORY_VERSION, "runs": runs}, f, indent=2)
+        f.write("\n")
+
+
+def new_run(results: Mapping[str, Stats]) -> dict[str, Any]:
+    return {
+        "date": datetime.now(UTC).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "results": {name: asdict(stats) for name, stats in results.items()},
+    }
+
+
+def baseline(runs: Sequence[Mapping[str, Any]], name: str) -> Stats | None:
+    for run in reversed(runs):
+        if (stats := run["results"].get(name)) is not None:
+            return Stats(**stats)
+    return None
+
+
+def expected_times(runs: Sequence[Mapping[str, Any]]) -> dict[str, float]:
+    """Expected time of each day, from the last recorded time of its parts.
+
+    For the days benchmarked as a whole, the time of their main() is used.
+    """
+    latest: dict[str, float] = {}
+    for run in runs:
+        latest |= {name: stats["median"] for name, stats in run["results"].items()}
+
+    expected = defaultdict[str, float](float)
+    for name, median in latest.items():
+        m = _CASE_RE.fullmatch(name)
+        if m is not None and m[3] in ("part1", "part2", "main"):
+            expected[f"{m[1]}/day{m[2]}"] += median
+    return expected
+
+
+def regressions(
+    runs: Sequence[Mapping[str, Any]],
+    results: Mapping[str, Stats],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[Regression]:
+    """Compare the median time of each result with the last recorded one."""
+    found = []
+    for name, stats in results.items():
+        base = baseline(runs, name)
+        if base is not None and stats.median > base.median * (1 + threshold):
+            found.append(Regression(name, base.median, stats.median))
+    return found
@@ -0,0 +1,116 @@
+from collections.abc import Iterable, Iterator
+from math import isqrt
+
+
+class BlockList:
+    """A list of distinct integers in [0, size), with fast index and insert.
+
+    The values are split in blocks of about √n values, with the block of
+    each value, and the block lengths in a Fenwick tree. Finding the index
+    of a value, or the block of an index, takes O(log n) steps plus a scan
+    or update of a single block.
+    """
+
+    _blocks: list[list[int]]
+    _block_of: list[int]
+    _tree: list[int]
+    _block_size: int
+    _len: int
+
+    def __init__(self, values: Iterable[int], size: int | None = None):
+        values = list(values)
+        self._len = len(values)
+        self._block_of = [0] * (size if size is not None else self._len)
+        self._block_size = max(16, isqrt(self._len))
+        self._rebuild(values)
+
+    def _rebuild(self, values: list[int]) -> None:
+        n = self._block_size
+        self._blocks = [values[i : i + n] for i in range(0, len(values), n)] or [[]]
+        for b, block in enumerate(self._blocks):
+            for v in block:
+                self._block_of[v] = b
+
+        # Fenwick tree of the block lengths, 1-based
+        tree = [0] * (len(self._blocks) + 1)
+        for b, block in enumerate(self._blocks, 1):
+            tree[b] += len(block)
+            if (parent := b + (b & -b)) < len(tree):
+                tree[parent] += tree[b]
+        self._tree = tree
+
+    def _add(self, b: int, delta: int) -> None:
+        tree = self._tree
+        b += 1
+        while b < len(tree):
+            tree[b] += delta
+            b += b & -b
+
+    def _offset(self, b: int) -> int:
+        # Number of values in the blocks before b
+        tree = self._tree
+        total = 0
+        while b > 0:
+            total += tree[b]
+            b -= b & -b
+        return total
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        # Block containing the index, and the index inside the block
+        tree = self._tree
+        b = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if (nxt := b + step) < len(tree) and tree[nxt] <= index:
+                b = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return b, index
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for block in self._blocks:
+            yield from block
+
+    def __getitem__(self, index: int) -> int:
+        b, i = self._locate(self._check(index))
+        return self._blocks[b][i]
+
+    def _check(self, index: int) -> int:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("BlockList index out of range")
+        return index
+
+    def index(self, value: int) -> int:
+        b = self._block_of[value]
+        return self._offset(b) + self._blocks[b].index(value)
+
+    def pop(self, index: int) -> int:
+        b, i = self._locate(self._check(index))
+        value = self._blocks[b].pop(i)
+        self._add(b, -1)
+        self._len -= 1
+        return value
+
+    def insert(self, index: int, value: int) -> None:
+        # Like list.insert, indices past the end append the value
+        if index < 0:
+            index = max(0, index + self._len)
+        if index >= self._len:
+            b = len(self._blocks) - 1
+            i = len(self._blocks[b])
+        else:
+            b, i = self._locate(index)
+
+        self._block_of[value] = b
+        block = self._blocks[b]
+        block.insert(i, value)
+        self._add(b, 1)
+        self._len += 1
+
+        if len(block) > 2 * self._block_size:
+            self._rebuild(list(self))
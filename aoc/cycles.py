@@ -0,0 +1,141 @@
+import hashlib
+import itertools
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Cycle:
+    """A sequence of states that repeats from `start` every `length` steps."""
+
+    start: int
+    length: int
+
+    def reduce(self, n: int) -> int:
+        """The first step with the same state as step `n`."""
+        if n < self.start:
+            return n
+        return self.start + (n - self.start) % self.length
+
+
+def fingerprint(*data: bytes | str) -> int:
+    """A 64-bit hash of the data, to store instead of large states."""
+    h = hashlib.blake2b(digest_size=8)
+    for d in data:
+        h.update(d.encode() if isinstance(d, str) else d)
+    return int.from_bytes(h.digest())
+
+
+def iterate[S](state: S, step: Callable[[S], S], n: int) -> S:
+    for _ in range(n):
+        state = step(state)
+    return state
+
+
+def brent[S](
+    state: S,
+    step: Callable[[S], S],
+    key: Callable[[S], Hashable] = lambda s: s,
+) -> Cycle:
+    """Find the cycle of the states with Brent's algorithm.
+
+    Only two states are kept, but `step` must not modify its argument,
+    and the states are computed again to find the start of the cycle.
+    """
+    # Find the length, searching in windows of increasing powers of two
+    power = length = 1
+    tortoise = state
+    hare = step(state)
+    while key(tortoise) != key(hare):
+        if power == length:
+            tortoise = hare
+            power *= 2
+            length = 0
+        hare = step(hare)
+        length += 1
+
+    # Find the start, with the hare `length` steps ahead of the tortoise
+    start = 0
+    tortoise = state
+    hare = iterate(state, step, length)
+    while key(tortoise) != key(hare):
+        tortoise = step(tortoise)
+        hare = step(hare)
+        start += 1
+
+    return Cycle(start, length)
+
+
+def _find_cycle[S, T](
+    state: S,
+    step: Callable[[S], S],
+    n: int,
+    key: Callable[[S], Hashable],
+    value: Callable[[S], T],
+    verify: bool,
+) -> tuple[Cycle | None, list[T]]:
+    # Only the key of each state is stored, usually a `fingerprint`.
+    # A repeated key is a cycle candidate, which is confirmed when the keys
+    # of the next full cycle repeat too, so a hash collision is not a cycle.
+    # Keys holding the full state need no verification.
+    seen: dict[Hashable, int] = {}
+    keys: list[Hashable] = []
+    values: list[T] = []
+    cycle = None
+
+    for t in itertools.count():
+        values.append(value(state))
+        if t == n:
+            return None, values
+
+        k = key(state)
+        keys.append(k)
+        if cycle is not None:
+            if k != keys[t - cycle.length]:
+                cycle = None
+            elif t == cycle.start + 2 * cycle.length:
+                return cycle, values
+        if cycle is None and k in seen:
+            cycle = Cycle(seen[k], t - seen[k])
+            if not verify:
+                return cycle, values
+        seen.setdefault(k, t)
+
+        state = step(state)
+
+    raise AssertionError("unreachable")
+
+
+def fast_forward[S, T](
+    state: S,
+    step: Callable[[S], S],
+    n: int,
+    *,
+    key: Callable[[S], Hashable],
+    value: Callable[[S], T],
+    verify: bool = True,
+) -> T:
+    """The value of the state after `n` steps, skipping the repeated cycles."""
+    cycle, values = _find_cycle(state, step, n, key, value, verify)
+    if cycle is None:
+        return values[n]
+    return values[cycle.reduce(n)]
+
+
+def extrapolate[S](
+    state: S,
+    step: Callable[[S], S],
+    n: int,
+    *,
+    key: Callable[[S], Hashable],
+    value: Callable[[S], int],
+    verify: bool = True,
+) -> int:
+    """The value of the state after `n` steps, for values changing by the
+    same amount after each repeated cycle of the keys."""
+    cycle, values = _find_cycle(state, step, n, key, value, verify)
+    if cycle is None:
+        return values[n]
+    m = cycle.reduce(n)
+    delta = values[cycle.start + cycle.length] - values[cycle.start]
+    return values[m] + (n - m) // cycle.length * delta
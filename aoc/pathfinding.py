@@ -0,0 +1,223 @@
+"""Shortest paths between the cells of flat grids.
+
+Cells are integer ids, row by row (y * width + x) for a `Layout`. The
+searches keep their distances in arrays indexed by cell, which are also
+their visited sets, instead of dicts keyed by coordinates. Searches
+without a size (for grids that grow as they are explored) can use any
+integers as cells, and keep their distances in a dict instead.
+"""
+
+import heapq
+from array import array
+from collections import deque
+from collections.abc import Callable, Container, Iterable
+from dataclasses import dataclass
+from typing import Final
+
+type Cell = int
+type Distances = array[int] | dict[Cell, int]
+type Step = Callable[[Cell], Iterable[Cell]]
+type WeightedStep = Callable[[Cell], Iterable[tuple[Cell, int]]]
+type Heuristic = Callable[[Cell], int]
+
+UNREACHED: Final = -1
+
+
+@dataclass(frozen=True)
+class Layout:
+    """The ids of the cells of a grid, row by row."""
+
+    width: int
+    height: int
+
+    @property
+    def size(self) -> int:
+        return self.width * self.height
+
+    def cell(self, x: int, y: int) -> Cell:
+        return y * self.width + x
+
+    def coord(self, cell: Cell) -> tuple[int, int]:
+        y, x = divmod(cell, self.width)
+        return x, y
+
+    def adjacent(self, cell: Cell) -> tuple[Cell, ...]:
+        """The cells up, left, right and down inside the grid, in reading order."""
+        w = self.width
+        y, x = divmod(cell, w)
+        cells = []
+        if y > 0:
+            cells.append(cell - w)
+        if x > 0:
+            cells.append(cell - 1)
+        if x < w - 1:
+            cells.append(cell + 1)
+        if y < self.height - 1:
+            cells.append(cell + w)
+        return tuple(cells)
+
+    def adjacency(self) -> list[tuple[Cell, ...]]:
+        """The adjacent cells of all the cells, to look them up in hot loops."""
+        return [self.adjacent(c) for c in range(self.size)]
+
+
+def manhattan(layout: Layout, goal: Cell) -> Heuristic:
+    gx, gy = layout.coord(goal)
+    width = layout.width
+
+    def distance(cell: Cell) -> int:
+        y, x = divmod(cell, width)
+        return abs(x - gx) + abs(y - gy)
+
+    return distance
+
+
+class _Unbounded(dict[Cell, int]):
+    def __missing__(self, cell: Cell) -> int:
+        return UNREACHED
+
+
+def _distances(size: int | None) -> Distances:
+    if size is None:
+        return _Unbounded()
+    return array("q", [UNREACHED]) * size
+
+
+def bfs(
+    size: int | None,
+    sources: Iterable[Cell],
+    step: Step,
+    *,
+    goals: Container[Cell] | None = None,
+) -> Distances:
+    """The distances from the nearest source, for unit steps.
+
+    With goals, the search stops at the first goal found. All the cells at
+    its distance have their distance set by then, so the caller can still
+    choose between the goals at the same distance.
+    """
+    dist = _distances(size)
+    queue: deque[Cell] = deque()
+    for s in sources:
+        if dist[s] == UNREACHED:
+            dist[s] = 0
+            queue.append(s)
+
+    while queue:
+        cell = queue.popleft()
+        if goals is not None and cell in goals:
+            break
+        d = dist[cell] + 1
+        for c in step(cell):
+            if dist[c] == UNREACHED:
+                dist[c] = d
+                queue.append(c)
+
+    return dist
+
+
+def bfs01(
+    size: int | None,
+    sources: Iterable[Cell],
+    step: WeightedStep,
+    *,
+    goal: Cell | None = None,
+) -> Distances:
+    """The distances from the nearest source, for steps of weight 0 or 1."""
+    dist = _distances(size)
+    queue: deque[tuple[int, Cell]] = deque()
+    for s in sources:
+        dist[s] = 0
+        queue.append((0, s))
+
+    while queue:
+        d, cell = queue.popleft()
+        if d > dist[cell]:
+            continue
+        if cell == goal:
+            break
+        for c, w in step(cell):
+            if dist[c] == UNREACHED or d + w < dist[c]:
+                dist[c] = d + w
+                if w == 0:
+                    queue.appendleft((d, c))
+                else:
+                    queue.append((d + 1, c))
+
+    return dist
+
+
+def dijkstra(
+    size: int | None,
+    sources: Iterable[Cell],
+    step: WeightedStep,
+    *,
+    max_weight: int,
+    goal: Cell | None = None,
+) -> Distances:
+    """The distances from the nearest source, for integer weights up to
+    `max_weight`.
+
+    The pending cells are kept in a circular array of buckets, one for each
+    distance from the current one, instead of a heap.
+    """
+    dist = _distances(size)
+    n_buckets = max_weight + 1
+    buckets: list[list[Cell]] = [[] for _ in range(n_buckets)]
+    pending = 0
+    for s in sources:
+        dist[s] = 0
+        buckets[0].append(s)
+        pending += 1
+
+    d = 0
+    while pending:
+        bucket = buckets[d % n_buckets]
+        while bucket:
+            cell = bucket.pop()
+            pending -= 1
+            if dist[cell] != d:
+                continue
+            if cell == goal:
+                return dist
+            for c, w in step(cell):
+                if dist[c] == UNREACHED or d + w < dist[c]:
+                    dist[c] = d + w
+                    buckets[(d + w) % n_buckets].append(c)
+                    pending += 1
+        d += 1
+
+    return dist
+
+
+def astar(
+    size: int | None,
+    sources: Iterable[Cell],
+    goal: Cell,
+    step: WeightedStep,
+    heuristic: Heuristic,
+) -> int:
+    """The distance from the nearest source to the goal, or UNREACHED.
+
+    The heuristic must never overestimate the distance to the goal, and not
+    decrease by more than the weight of a step.
+    """
+    dist = _distances(size)
+    queue: list[tuple[int, int, Cell]] = []
+    for s in sources:
+        dist[s] = 0
+        queue.append((heuristic(s), 0, s))
+    heapq.heapify(queue)
+
+    while queue:
+        _, d, cell = heapq.heappop(queue)
+        if d > dist[cell]:
+            continue
+        if cell == goal:
+            return d
+        for c, w in step(cell):
+            if dist[c] == UNREACHED or d + w < dist[c]:
+                dist[c] = d + w
+                heapq.heappush(queue, (d + w + heuristic(c), d + w, c))
+
+    return UNREACHED
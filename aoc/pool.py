@@ -0,0 +1,97 @@
+import math
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Iterator, Mapping, Sequence
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from time import perf_counter
+
+from aoc.runner import Day, DayResult, run_day
+
+
+def _worker(day: Day, conn: Connection, metrics: bool) -> None:
+    with conn:
+        conn.send(run_day(day, metrics=metrics))
+
+
+def _schedule(days: Sequence[Day], expected: Mapping[str, float]) -> deque[Day]:
+    # Longest expected job first, days without timings are assumed the slowest
+    return deque(
+        sorted(days, key=lambda d: expected.get(d.name, math.inf), reverse=True)
+    )
+
+
+def run_parallel(
+    days: Sequence[Day],
+    *,
+    jobs: int | None = None,
+    timeout: float | None = None,
+    expected: Mapping[str, float] | None = None,
+    metrics: bool = False,
+) -> Iterator[DayResult]:
+    """Run each day in its own process, with at most `jobs` running at once.
+
+    Days are started longest-expected-first, using the `expected` time of
+    each day name. A day running longer than `timeout` seconds is killed.
+    Results are yielded in the same order as `days`.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    context = multiprocessing.get_context("spawn")
+
+    order = {day: i for i, day in enumerate(days)}
+    queue = _schedule(days, expected or {})
+    running: dict[Connection, tuple[Day, BaseProcess, float]] = {}
+    finished: dict[int, DayResult] = {}
+    next_result = 0
+
+    def start(day: Day) -> None:
+        recv, send = context.Pipe(duplex=False)
+        proc = context.Process(target=_worker, args=(day, send, metrics), name=day.name)
+        proc.start()
+        send.close()
+        running[recv] = (day, proc, perf_counter())
+
+    def collect(conn: Connection, ready: bool) -> DayResult | None:
+        day, proc, started = running[conn]
+        if ready:
+            try:
+                result: DayResult = conn.recv()
+            except EOFError:
+                proc.join()
+                result = DayResult(
+                    day, status="error", error=f"exit code {proc.exitcode}"
+                )
+        elif timeout is not None and perf_counter() - started >= timeout:
+            proc.kill()
+            result = DayResult(day, status="timeout", error=f"timeout after {timeout}s")
+        else:
+            return None
+        proc.join()
+        conn.close()
+        del running[conn]
+        return result
+
+    try:
+        while queue or running:
+            while queue and len(running) < jobs:
+                start(queue.popleft())
+
+            wait_time = None
+            if timeout is not None:
+                deadline = min(t for _, _, t in running.values()) + timeout
+                wait_time = max(0.0, deadline - perf_counter())
+            ready = wait(list(running), wait_time)
+
+            for conn in list(running):
+                if (result := collect(conn, conn in ready)) is not None:
+                    finished[order[result.day]] = result
+
+            while next_result in finished:
+                yield finished.pop(next_result)
+                next_result += 1
+    finally:
+        for conn, (_, proc, _) in running.items():
+            proc.kill()
+            proc.join()
+            conn.close()
@@ -0,0 +1,44 @@
+from array import array
+from collections.abc import Iterable, MutableSequence
+
+
+def _table(size: int, compact: bool) -> MutableSequence[int]:
+    if compact:
+        return array("I", bytes(array("I").itemsize * size))
+    return [0] * size
+
+
+class Ring:
+    """A circular linked list of integers in [0, size), as a successor table.
+
+    Values not in the ring are ignored. Hot loops can bind the `succ` table
+    to a local and update it directly.
+
+    A compact ring keeps the table in an array of 4 bytes per value, instead
+    of a list pointer plus an int object, but reading it is about twice as
+    slow, since each read creates a new int.
+    """
+
+    succ: MutableSequence[int]
+
+    def __init__(self, values: Iterable[int], size: int, *, compact: bool = False):
+        """A ring of the values in the given order."""
+        self.succ = succ = _table(size, compact)
+
+        it = iter(values)
+        first = prev = next(it)
+        for v in it:
+            succ[prev] = v
+            prev = v
+        succ[prev] = first
+
+    def after(self, value: int, k: int = 1) -> int:
+        succ = self.succ
+        for _ in range(k):
+            value = succ[value]
+        return value
+
+    def insert_after(self, value: int, new: int) -> None:
+        succ = self.succ
+        succ[new] = succ[value]
+        succ[value] = new
@@ -0,0 +1,349 @@
+import ast
+import contextlib
+import importlib.util
+import inspect
+import io
+import re
+import sys
+import textwrap
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from functools import partial, wraps
+from pathlib import Path
+from time import perf_counter
+from types import ModuleType
+from typing import Any, Final
+
+from aoc import trace
+
+ROOT: Final = Path(__file__).resolve().parent.parent
+
+_DAY_RE: Final = re.compile(r"day(\d\d)\.py")
+
+type Answer = str | None
+
+
+@dataclass(frozen=True)
+class Day:
+    year: int
+    day: int
+    path: Path
+
+    @property
+    def name(self) -> str:
+        return f"{self.year}/day{self.day:02}"
+
+    @property
+    def input_path(self) -> Path:
+        return self.path.with_name(f"input{self.day:02}.txt")
+
+
+@dataclass
+class DayResult:
+    day: Day
+    status: str = "ok"
+    times: dict[str, float] = field(default_factory=dict)
+    answers: dict[str, Answer] = field(default_factory=dict)
+    error: str | None = None
+    failed: str | None = None
+    metrics: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def total(self) -> float:
+        return sum(self.times.values())
+
+    def rows(self) -> Iterator[dict[str, Any]]:
+        if not self.times:
+            yield self._row("-", None, None)
+        for phase, secs in self.times.items():
+            yield self._row(phase, secs, self.answers.get(phase))
+
+    def _succeeded(self, phase: str) -> bool:
+        # The error is shown in the phase that failed, or in the only row
+        return self.error is None or (self.failed is not None and phase != self.failed)
+
+    def _row(self, phase: str, secs: float | None, answer: Answer) -> dict[str, Any]:
+        return {
+            "year": self.day.year,
+            "day": self.day.day,
+            "phase": phase,
+            "status": self.status,
+            "seconds": secs,
+            "answer": answer if self._succeeded(phase) else self.error,
+        }
+
+
+def years(root: Path = ROOT) -> list[int]:
+    return sorted(int(p.name) for p in root.glob("20[0-9][0-9]") if p.is_dir())
+
+
+def find_days(year: int, days: Sequence[int] = (), *, root: Path = ROOT) -> list[Day]:
+    found = []
+    for path in sorted((root / str(year)).glob("day[0-9][0-9].py")):
+        m = _DAY_RE.fullmatch(path.name)
+        assert m is not None
+        day = int(m[1])
+        if not days or day in days:
+            found.append(Day(year, day, path))
+    return found
+
+
+def load_module(day: Day) -> ModuleType:
+    # Unique module name per year, so all days can be loaded in one process
+    name = f"aoc_{day.year}_day{day.day:02}"
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.spec_from_file_location(name, day.path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+
+    # Helper modules shared between days are imported from the year directory
+    sys.path.insert(0, str(day.path.parent))
+    try:
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    finally:
+        sys.path.remove(str(day.path.parent))
+    return module
+
+
+def _timed[T](times: dict[str, float], phase: str, fn: Callable[[], T]) -> T:
+    # A failed phase is also timed, to report its error
+    start = perf_counter()
+    try:
+        return fn()
+    finally:
+        times[phase] = perf_counter() - start
+
+
+def _reader(module: ModuleType) -> str:
+    return "read_data" if hasattr(module, "read_data") else "parse_data"
+
+
+def part_calls(module: ModuleType) -> dict[str, bool] | None:
+    """How the main() of the module calls each part, if it can be run per part.
+
+    That is a main() that only parses the input and prints each part of the
+    parsed data, as `print(f"P1: {part1(data)}")`, with the data unpacked
+    (True) or not (False). Days that prepare, copy or format anything else
+    in main() are None, and are run through their main(). Modules without
+    a main() have each part called with the parsed data.
+    """
+    parts = [p for p in ("part1", "part2") if hasattr(module, p)]
+    if not hasattr(module, "main"):
+        return dict.fromkeys(parts, False) or None
+
+    try:
+        source = inspect.getsource(module.main)
+    except (OSError, TypeError):
+        return None
+
+    match ast.parse(textwrap.dedent(source)).body:
+        case [ast.FunctionDef(body=body)]:
+            pass
+        case _:
+            return None
+
+    stmts = [s for s in body if ast.unparse(s) != "trace.configure()"]
+    match stmts:
+        case [
+            ast.Assign(
+                targets=[ast.Name(id=data)],
+                value=ast.Call(func=ast.Name(id=reader), args=[arg], keywords=[]),
+            ),
+            *prints,
+        ] if reader == _reader(module) and ast.unparse(arg) == "open(0)":
+            pass
+        case _:
+            return None
+
+    calls = {}
+    for i, stmt in enumerate(prints, 1):
+        match stmt:
+            case ast.Expr(
+                value=ast.Call(
+                    func=ast.Name(id="print"),
+                    args=[
+                        ast.JoinedStr(
+                            values=[
+                                ast.Constant(value=prefix),
+                                ast.FormattedValue(
+                                    value=ast.Call(
+                                        func=ast.Name(id=part), args=[arg], keywords=[]
+                                    ),
+                                    conversion=-1,
+                                    format_spec=None,
+                                ),
+                            ]
+                        )
+                    ],
+                    keywords=[],
+                )
+            ) if prefix == f"P{i}: " and part == f"part{i}":
+                pass
+            case _:
+                return None
+        match arg:
+            case ast.Name(id=name) if name == data:
+                calls[part] = False
+            case ast.Starred(value=ast.Name(id=name)) if name == data:
+                calls[part] = True
+            case _:
+                return None
+
+    return calls if parts and list(calls) == parts else None
+
+
+def call_part(fn: Callable[..., Any], data: Any, unpack: bool) -> Any:
+    return fn(*data) if unpack else fn(data)
+
+
+def parse_input(module: ModuleType, path: Path) -> Any:
+    reader = getattr(module, _reader(module))
+    with open(path) as f:
+        return reader(f)
+
+
+def _run_parts(
+    module: ModuleType, calls: dict[str, bool], path: Path, result: DayResult
+) -> None:
+    data = _timed(result.times, "parse", partial(parse_input, module, path))
+
+    for phase, unpack in calls.items():
+        fn = getattr(module, phase)
+        answer = _timed(result.times, phase, partial(call_part, fn, data, unpack))
+        result.answers[phase] = str(answer)
+
+
+@contextlib.contextmanager
+def _stdin_from(module: ModuleType, path: Path) -> Iterator[None]:
+    # Solutions read their input with open(0), shadow it in the module globals
+    def open_input(file: Any, *args: Any, **kwargs: Any) -> Any:
+        return open(path if file == 0 else file, *args, **kwargs)
+
+    module.open = open_input  # type: ignore[attr-defined]
+    try:
+        yield
+    finally:
+        delattr(module, "open")
+
+
+@contextlib.contextmanager
+def _trace_configured() -> Iterator[None]:
+    # The main() of the solutions configures the trace output to stdout,
+    # keep the one of the runner instead of mixing it with the answers
+    configure = trace.configure
+    trace.configure = lambda *args, **kwargs: None
+    try:
+        yield
+    finally:
+        trace.configure = configure
+
+
+@contextlib.contextmanager
+def _phases_timed(module: ModuleType, result: DayResult) -> Iterator[None]:
+    # The calls of main() to the reader and the parts are timed as phases,
+    # by shadowing them in the module globals
+    phases = {_reader(module): "parse", "part1": "part1", "part2": "part2"}
+    saved = {name: getattr(module, name) for name in phases if hasattr(module, name)}
+
+    def timed(phase: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(fn)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            try:
+                answer = _timed(result.times, phase, partial(fn, *args, **kwargs))
+            except Exception:
+                result.failed = phase
+                raise
+            if phase != "parse":
+                result.answers[phase] = str(answer)
+            return answer
+
+        return call
+
+    for name, fn in saved.items():
+        setattr(module, name, timed(phases[name], fn))
+    try:
+        yield
+    finally:
+        for name, fn in saved.items():
+            setattr(module, name, fn)
+
+
+def call_main(module: ModuleType, path: Path) -> str:
+    """Run main() with the input file as stdin, returning what it prints."""
+    out = io.StringIO()
+    with (
+        _stdin_from(module, path),
+        _trace_configured(),
+        contextlib.redirect_stdout(out),
+    ):
+        module.main()
+    return out.getvalue().rstrip()
+
+
+def _run_main(
+    module: ModuleType, path: Path, result: DayResult, *, phases: bool
+) -> None:
+    timed = _phases_timed(module, result) if phases else contextlib.nullcontext()
+    start = perf_counter()
+    try:
+        with timed:
+            answer = call_main(module, path)
+    finally:
+        # The rest of main(), like preparing the data and printing the answers
+        result.times["main"] = perf_counter() - start - result.total
+    result.answers["main"] = answer
+
+
+def run_day(
+    day: Day,
+    input_path: Path | None = None,
+    *,
+    metrics: bool = False,
+    main: bool = False,
+) -> DayResult:
+    """Run the solution of a single day, timing each phase separately.
+
+    Days whose main() only prints the parts of the parsed data are timed
+    per phase (see `part_calls`). Other days are run through their main()
+    function, timing the calls it makes to the reader, part1 and part2 as
+    phases, and the rest of it as the main phase. With `main`, all days are
+    run through main() as a single phase. With `metrics`, the counters and
+    spans recorded by the solution are kept.
+    """
+    result = DayResult(day)
+    path = input_path or day.input_path
+    if not path.is_file():
+        result.status = "missing"
+        result.error = f"missing {path.name}"
+        return result
+
+    collect = trace.collect() if metrics else contextlib.nullcontext()
+    try:
+        with collect as recorded:
+            module = load_module(day)
+            if main:
+                _run_main(module, path, result, phases=False)
+            elif (calls := part_calls(module)) is not None:
+                _run_parts(module, calls, path, result)
+            else:
+                _run_main(module, path, result, phases=True)
+        if recorded is not None:
+            result.metrics = recorded.export()
+    except Exception as e:
+        result.status = "error"
+        result.error = f"{type(e).__name__}: {e}"
+        if result.failed is None:
+            result.failed = next(reversed(result.times), None)
+
+    return result
+
+
+def run_days(days: Sequence[Day], *, metrics: bool = False) -> Iterator[DayResult]:
+    for day in days:
+        yield run_day(day, metrics=metrics)
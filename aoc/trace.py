@@ -0,0 +1,85 @@
+"""Opt-in trace output and metrics of the solutions.
+
+Trace messages are written with `logging`, and metrics are only recorded
+inside `collect()`. Solutions check `enabled()` once before their loops,
+and count the iterations of a loop once it is done.
+"""
+
+import logging
+import os
+import sys
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Final, TextIO
+
+ENV: Final = "AOC_TRACE"
+
+
+@dataclass
+class Metrics:
+    counts: Counter[str] = field(default_factory=Counter)
+    spans: defaultdict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    def export(self) -> dict[str, Any]:
+        return {"counts": dict(self.counts), "spans": dict(self.spans)}
+
+
+_metrics: Metrics | None = None
+
+
+def configure(level: int | str | None = None, stream: TextIO | None = None) -> None:
+    """Write the trace messages to stdout (or stream), without decoration.
+
+    The default level is taken from the AOC_TRACE environment variable
+    (e.g. AOC_TRACE=debug), otherwise no trace messages are written.
+    """
+    if level is None:
+        level = os.environ.get(ENV, "warning")
+    if isinstance(level, str):
+        level = logging.getLevelNamesMapping()[level.upper()]
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+
+def enabled(level: int = logging.DEBUG) -> bool:
+    return logging.getLogger().isEnabledFor(level)
+
+
+def count(name: str, n: int = 1) -> None:
+    if _metrics is not None:
+        _metrics.counts[name] += n
+
+
+def span(name: str) -> AbstractContextManager[None]:
+    """Add the time of the block to the named span."""
+    if _metrics is None:
+        return nullcontext()
+    return _timed(_metrics, name)
+
+
+@contextmanager
+def _timed(metrics: Metrics, name: str) -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.spans[name] += perf_counter() - start
+
+
+@contextmanager
+def collect() -> Iterator[Metrics]:
+    """Record the metrics of the block."""
+    global _metrics
+    prev, _metrics = _metrics, Metrics()
+    try:
+        yield _metrics
+    finally:
+        _metrics = prev
@@ -0,0 +1,44 @@
+class UnionFind:
+    """Disjoint sets of the integers in [0, n).
+
+    The sets are trees of parent links, with the smaller tree linked under
+    the larger one, and the paths compressed on each find.
+    """
+
+    _parent: list[int]
+    _size: list[int]
+    count: int
+
+    def __init__(self, n: int):
+        self._parent = list(range(n))
+        self._size = [1] * n
+        self.count = n
+
+    def find(self, x: int) -> int:
+        parent = self._parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a: int, b: int) -> bool:
+        """Merge the sets of a and b, unless they are the same set."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        size = self._size
+        if size[a] < size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        size[a] += size[b]
+        self.count -= 1
+        return True
+
+    def size(self, x: int) -> int:
+        return self._size[self.find(x)]
+
+    def sizes(self) -> list[int]:
+        """The sizes of all the sets."""
+        return [s for x, s in enumerate(self._size) if self._parent[x] == x]